@@ -0,0 +1,342 @@
+"""End-to-end concurrency and latency benchmark for TelnetClient.
+
+Runs N clients on one event loop, each against its own emulated ISP server,
+drives mixed workloads and reports command -> state confirmation latency,
+notification lag, event loop lag and memory per client. Results are written
+as JSON so that releases can be compared.
+
+    python benchmarks/e2e_benchmark.py --clients 32 --duration 10 \\
+        --output bench_results.json
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+from decimal import Decimal
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import typing
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from isp_emulator import IspEmulator  # noqa: E402
+from stormaudio_isp_telnet.telnet_client import TelnetClient  # noqa: E402
+
+WORKLOADS: tuple[str, ...] = ('slider', 'preset', 'notify', 'reconnect')
+
+
+def _percentile(
+    values: list[float],
+    percentile: float
+) -> float:
+    """Nearest-rank percentile; None for an empty list."""
+    if len(values) == 0:
+        return None
+    ordered: list[float] = sorted(values)
+    rank: int = max(0, min(len(ordered) - 1,
+                           int(round(percentile / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def _summarize_ms(
+    values: list[float]
+) -> dict[str, typing.Any]:
+    """Summarizes durations given in seconds, in milliseconds."""
+    def ms(x: float) -> float:
+        return None if x is None else round(x * 1000, 3)
+    return {
+        'count': len(values),
+        'p50_ms': ms(_percentile(values, 50)),
+        'p99_ms': ms(_percentile(values, 99)),
+        'max_ms': ms(max(values) if len(values) > 0 else None),
+    }
+
+
+class ClientProbe:
+    """One benchmarked client and its emulated server; matches state
+    updates against outstanding commands and notifications."""
+
+    def __init__(
+        self,
+        emulator: IspEmulator
+    ):
+        self.emulator: IspEmulator = emulator
+        self.client: TelnetClient = TelnetClient(
+            emulator.host,
+            async_on_device_state_updated=self._async_on_device_state_updated,
+            async_on_disconnected=self._async_on_disconnected,
+            port=emulator.port
+        )
+        # volume tenths / preset id -> send time of the pending command
+        self.pending_volumes: dict[int, float] = {}
+        self.pending_presets: dict[int, float] = {}
+        self.volume_latencies: list[float] = []
+        self.preset_latencies: list[float] = []
+        self.notification_lags: list[float] = []
+        # Time to ready of every connection, including reconnects
+        self.ready_times: list[float] = []
+        self.superseded_count: int = 0
+        self.disconnect_count: int = 0
+
+    async def _async_on_device_state_updated(
+        self
+    ) -> None:
+        now: float = time.monotonic()
+        state = self.client.get_device_state()
+        self._confirm(
+            self.pending_volumes, state.volume_db_tenths, now, self.volume_latencies)
+        self._confirm(
+            self.pending_presets, state.preset_id, now, self.preset_latencies)
+        if state.volume_db is not None:
+            sent_at: float = self.emulator.notification_sent_at.pop(
+                str(state.volume_db), None)
+            if sent_at is not None:
+                self.notification_lags.append(now - sent_at)
+
+    def _confirm(
+        self,
+        pending: dict[int, float],
+        value: int,
+        now: float,
+        latencies: list[float]
+    ) -> None:
+        sent_at: float = pending.pop(value, None)
+        if sent_at is None:
+            return
+        latencies.append(now - sent_at)
+        # Commands sent before the confirmed one were coalesced by the device
+        # or the read loop and will not be confirmed individually
+        for key in [k for k, v in pending.items() if v <= sent_at]:
+            del pending[key]
+            self.superseded_count += 1
+
+    async def _async_on_disconnected(
+        self
+    ) -> None:
+        self.disconnect_count += 1
+
+
+async def _async_measure_loop_lag(
+    lags: list[float],
+    interval: float,
+    stop: asyncio.Event
+) -> None:
+    while not stop.is_set():
+        expected: float = time.monotonic() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.monotonic() - expected))
+
+
+async def _async_slider_storm(
+    probe: ClientProbe,
+    stop: asyncio.Event,
+    interval: float
+) -> None:
+    # Command values stay within -60..-1 dB; notifications use -80..-70 dB
+    step: int = 0
+    while not stop.is_set():
+        tenths: int = -600 + (step % 590) * 1
+        step += 1
+        probe.pending_volumes[tenths] = time.monotonic()
+        await probe.client.async_set_volume(Decimal(tenths).scaleb(-1))
+        await asyncio.sleep(interval)
+
+
+async def _async_preset_flips(
+    probe: ClientProbe,
+    stop: asyncio.Event,
+    interval: float
+) -> None:
+    while not stop.is_set():
+        preset_id: int = 1 + (probe.client.get_device_state().preset_id or 0) \
+            % probe.emulator.preset_count
+        probe.pending_presets[preset_id] = time.monotonic()
+        await probe.client.async_set_preset_id(preset_id)
+        await asyncio.sleep(interval)
+
+
+async def _async_notifications(
+    probes: list[ClientProbe],
+    stop: asyncio.Event,
+    interval: float
+) -> None:
+    step: int = 0
+    while not stop.is_set():
+        volume: str = str(Decimal(-800 + step % 100).scaleb(-1))
+        step += 1
+        for probe in probes:
+            probe.emulator.notify_volume(volume)
+        await asyncio.sleep(interval)
+
+
+async def _async_reconnects(
+    probes: list[ClientProbe],
+    stop: asyncio.Event,
+    interval: float,
+    reconnect_times: list[float]
+) -> None:
+    while not stop.is_set():
+        await asyncio.sleep(interval)
+        probe: ClientProbe = random.choice(probes)
+        started_at: float = time.monotonic()
+        await probe.client.async_disconnect()
+        await probe.client.async_connect()
+        # Waits for every field to be refreshed on the new connection;
+        # values kept from the previous one do not count
+        probe.ready_times.append(await probe.client.async_wait_ready())
+        reconnect_times.append(time.monotonic() - started_at)
+
+
+async def async_run_benchmark(
+    client_count: int,
+    duration: float,
+    workloads: typing.Iterable[str] = WORKLOADS,
+    slider_interval: float = 0.01,
+    preset_interval: float = 0.25,
+    notify_interval: float = 0.05,
+    reconnect_interval: float = 0.5,
+    response_delay: float = 0.0
+) -> dict[str, typing.Any]:
+    workloads = tuple(workloads)
+    emulators: list[IspEmulator] = [
+        IspEmulator(response_delay=response_delay) for _ in range(client_count)]
+    for emulator in emulators:
+        await emulator.async_start()
+
+    # Memory is traced only while the clients connect and populate state;
+    # tracing during the workloads would distort the latencies
+    tracemalloc.start()
+    memory_before: int = tracemalloc.get_traced_memory()[0]
+    probes: list[ClientProbe] = [ClientProbe(x) for x in emulators]
+    connect_started_at: float = time.monotonic()
+    await asyncio.gather(*(x.client.async_connect() for x in probes))
+    for probe, ready_time in zip(probes, await asyncio.gather(
+            *(x.client.async_wait_ready() for x in probes))):
+        probe.ready_times.append(ready_time)
+    connect_all_time: float = time.monotonic() - connect_started_at
+    memory_after: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    stop: asyncio.Event = asyncio.Event()
+    loop_lags: list[float] = []
+    reconnect_times: list[float] = []
+    tasks: list[asyncio.Task] = [asyncio.create_task(
+        _async_measure_loop_lag(loop_lags, 0.01, stop))]
+    if 'slider' in workloads:
+        tasks.extend(asyncio.create_task(
+            _async_slider_storm(x, stop, slider_interval)) for x in probes)
+    if 'preset' in workloads:
+        tasks.extend(asyncio.create_task(
+            _async_preset_flips(x, stop, preset_interval)) for x in probes)
+    if 'notify' in workloads:
+        tasks.append(asyncio.create_task(
+            _async_notifications(probes, stop, notify_interval)))
+    if 'reconnect' in workloads:
+        tasks.append(asyncio.create_task(
+            _async_reconnects(probes, stop, reconnect_interval, reconnect_times)))
+
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    # Allow in-flight confirmations to arrive
+    await asyncio.sleep(0.2)
+
+    for probe in probes:
+        await probe.client.async_disconnect()
+    for emulator in emulators:
+        await emulator.async_stop()
+
+    def collect(name: str) -> list[float]:
+        return [x for probe in probes for x in getattr(probe, name)]
+
+    return {
+        'parameters': {
+            'clients': client_count,
+            'duration_s': duration,
+            'workloads': list(workloads),
+            'slider_interval_s': slider_interval,
+            'preset_interval_s': preset_interval,
+            'notify_interval_s': notify_interval,
+            'reconnect_interval_s': reconnect_interval,
+            'response_delay_s': response_delay,
+        },
+        'connect_all_ms': round(connect_all_time * 1000, 3),
+        'time_to_ready': _summarize_ms(collect('ready_times')),
+        'volume_confirmation': _summarize_ms(collect('volume_latencies')),
+        'preset_confirmation': _summarize_ms(collect('preset_latencies')),
+        'superseded_commands': sum(x.superseded_count for x in probes),
+        'notification_lag': _summarize_ms(collect('notification_lags')),
+        'event_loop_lag': _summarize_ms(loop_lags),
+        'reconnect': _summarize_ms(reconnect_times),
+        'memory_per_client_bytes': (memory_after - memory_before) // client_count,
+        'parse_errors': sum(
+            x.client.get_parse_diagnostics().get_error_count() for x in probes),
+    }
+
+
+def _environment() -> dict[str, typing.Any]:
+    try:
+        from importlib.metadata import version
+        package_version: str = version('stormaudio_isp_telnet')
+    except Exception:
+        package_version = None
+    return {
+        'package_version': package_version,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+
+
+def main(
+    argv: list[str] = None
+) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument(
+        '--workloads', default=','.join(WORKLOADS),
+        help=f'comma separated subset of: {", ".join(WORKLOADS)}')
+    parser.add_argument('--slider-interval', type=float, default=0.01)
+    parser.add_argument('--preset-interval', type=float, default=0.25)
+    parser.add_argument('--notify-interval', type=float, default=0.05)
+    parser.add_argument('--reconnect-interval', type=float, default=0.5)
+    parser.add_argument('--response-delay', type=float, default=0.0)
+    parser.add_argument(
+        '--output', help='path of the JSON results file; stdout if omitted')
+    args = parser.parse_args(argv)
+
+    workloads: list[str] = [x for x in args.workloads.split(',') if x]
+    for workload in workloads:
+        if workload not in WORKLOADS:
+            parser.error(f'unknown workload: {workload}')
+
+    results: dict[str, typing.Any] = asyncio.run(async_run_benchmark(
+        client_count=args.clients,
+        duration=args.duration,
+        workloads=workloads,
+        slider_interval=args.slider_interval,
+        preset_interval=args.preset_interval,
+        notify_interval=args.notify_interval,
+        reconnect_interval=args.reconnect_interval,
+        response_delay=args.response_delay
+    ))
+    report: str = json.dumps(
+        {'environment': _environment(), 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
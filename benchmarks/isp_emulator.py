@@ -0,0 +1,236 @@
+"""Minimal emulated Storm Audio ISP telnet server, for benchmarks and local
+testing. Speaks the subset of the TCP/IP API used by TelnetClient."""
+
+from __future__ import annotations
+import asyncio
+import re
+import time
+
+import typing
+
+
+_TELNET_NEGOTIATION = re.compile(
+    rb'\xff[\xfb-\xfe].|\xff\xfa.*?\xff\xf0|\xff.', re.DOTALL)
+
+
+class IspEmulator:
+    """Serves one emulated processor on a local port. Every connection gets
+    a full state dump, and state changes are broadcast to all connections
+    like the real device does."""
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        zone_count: int = 2,
+        input_count: int = 8,
+        preset_count: int = 4,
+        response_delay: float = 0.0
+    ):
+        self.host: str = host
+        self.port: int = port
+        self.response_delay: float = response_delay
+        self.volume: str = '-40.0'
+        self.mute: bool = False
+        self.input_id: int = 1
+        self.input_zone2_id: int = 0
+        self.preset_id: int = 1
+        self.power: bool = True
+        self.zones: dict[int, list[str]] = {
+            x: ['-3.0', '0.0', '0'] for x in range(1, zone_count + 1)}
+        self.input_count: int = input_count
+        self.preset_count: int = preset_count
+        # Send times (time.monotonic()) of unsolicited volume broadcasts
+        self.notification_sent_at: dict[str, float] = {}
+        self._server: asyncio.AbstractServer = None
+        self._writers: set[asyncio.StreamWriter] = set()
+        self._handlers: set[asyncio.Task] = set()
+
+    async def async_start(
+        self
+    ) -> None:
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def async_stop(
+        self
+    ) -> None:
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._server.wait_closed()
+
+    def drop_connections(
+        self
+    ) -> None:
+        """Closes every client connection, as a device reboot would."""
+        for writer in list(self._writers):
+            writer.close()
+
+    def notify_volume(
+        self,
+        volume: str
+    ) -> None:
+        """Changes the volume as if from the front panel or another client."""
+        self.volume = volume
+        self.notification_sent_at[volume] = time.monotonic()
+        self._broadcast([f'ssp.vol.[{volume}]'])
+
+    def _dump_lines(
+        self
+    ) -> list[str]:
+        lines: list[str] = [
+            'ssp.brand.["Storm Audio"]',
+            'ssp.model.["ISP Emulator"]',
+            f'ssp.power.{"on" if self.power else "off"}',
+            f'ssp.procstate.[{2 if self.power else 0}]',
+            f'ssp.vol.[{self.volume}]',
+            f'ssp.mute.{"on" if self.mute else "off"}',
+        ]
+        lines.extend(self._input_lines())
+        lines.extend(self._zone_lines())
+        lines.extend(self._preset_lines())
+        lines.extend([
+            f'ssp.preset.[{self.preset_id}]',
+            f'ssp.input.[{self.input_id}]',
+            f'ssp.inputZone2.[{self.input_zone2_id}]',
+        ])
+        return lines
+
+    def _input_lines(
+        self
+    ) -> list[str]:
+        return ['ssp.input.start'] + [
+            f'ssp.input.list.["Input {x}", {x}, {min(x, 8)}, {min(x, 26)}, 0, 0, 0.0]'
+            for x in range(1, self.input_count + 1)
+        ] + ['ssp.input.end']
+
+    def _zone_lines(
+        self
+    ) -> list[str]:
+        return ['ssp.zones.start'] + [
+            f'ssp.zones.list.[{x}, "Zone {x}", 2000, 0, 0, {v[0]}, {v[1]}, 0, 0, 0, {v[2]}]'
+            for x, v in self.zones.items()
+        ] + ['ssp.zones.end']
+
+    def _preset_lines(
+        self
+    ) -> list[str]:
+        zone_ids: str = '","'.join(str(x) for x in self.zones)
+        return ['ssp.preset.start'] + [
+            f'ssp.preset.list.["Preset {x}", {x}, "["{zone_ids}"]", 0]'
+            for x in range(1, self.preset_count + 1)
+        ] + ['ssp.preset.end']
+
+    def _broadcast(
+        self,
+        lines: list[str]
+    ) -> None:
+        data: bytes = ''.join(x + '\n' for x in lines).encode()
+        for writer in list(self._writers):
+            if not writer.is_closing():
+                writer.write(data)
+
+    def _reply(
+        self,
+        writer: asyncio.StreamWriter,
+        lines: list[str]
+    ) -> None:
+        if not writer.is_closing():
+            writer.write(''.join(x + '\n' for x in lines).encode())
+
+    async def _handle_connection(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter
+    ) -> None:
+        self._writers.add(writer)
+        self._handlers.add(asyncio.current_task())
+        try:
+            self._reply(writer, self._dump_lines())
+            while True:
+                line: bytes = await reader.readline()
+                if not line:
+                    break
+                # Telnet option negotiation from the client is ignored
+                command: str = _TELNET_NEGOTIATION.sub(b'', line) \
+                    .decode(errors='replace').strip()
+                if self.response_delay > 0:
+                    await asyncio.sleep(self.response_delay)
+                self._handle_command(writer, command)
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+    def _handle_command(
+        self,
+        writer: asyncio.StreamWriter,
+        command: str
+    ) -> None:
+        if command == 'ssp.keepalive':
+            self._reply(writer, ['ssp.keepalive'])
+        elif command.startswith('ssp.vol.['):
+            self.volume = command[len('ssp.vol.['): -1]
+            self._broadcast([f'ssp.vol.[{self.volume}]'])
+        elif command in ('ssp.mute.on', 'ssp.mute.off', 'ssp.mute.toggle'):
+            self.mute = command == 'ssp.mute.on' or \
+                (command == 'ssp.mute.toggle' and not self.mute)
+            self._broadcast([f'ssp.mute.{"on" if self.mute else "off"}'])
+        elif command in ('ssp.power.on', 'ssp.power.off'):
+            self.power = command == 'ssp.power.on'
+            self._broadcast([
+                f'ssp.power.{"on" if self.power else "off"}',
+                f'ssp.procstate.[{2 if self.power else 0}]'])
+        elif command.startswith('ssp.preset.['):
+            self.preset_id = int(command[len('ssp.preset.['): -1])
+            self._broadcast([f'ssp.preset.[{self.preset_id}]'])
+        elif command.startswith('ssp.inputZone2.['):
+            self.input_zone2_id = int(command[len('ssp.inputZone2.['): -1])
+            self._broadcast([f'ssp.inputZone2.[{self.input_zone2_id}]'])
+        elif command.startswith('ssp.input.['):
+            self.input_id = int(command[len('ssp.input.['): -1])
+            self._broadcast([f'ssp.input.[{self.input_id}]'])
+        elif command.startswith('ssp.zones.') and command.endswith(']'):
+            self._handle_zone_command(command)
+        else:
+            self._reply(writer, self._query_lines(command))
+
+    def _handle_zone_command(
+        self,
+        command: str
+    ) -> None:
+        name, _, fields = command[len('ssp.zones.'): -1].partition('.[')
+        zone_id, _, value = fields.partition(', ')
+        zone: list[str] = self.zones.get(int(zone_id))
+        slot: int = {'volume': 0, 'delay': 1, 'mute': 2}.get(name)
+        if zone is not None and slot is not None:
+            zone[slot] = value
+            self._broadcast([f'ssp.zones.{name}.[{zone_id}, {value}]'])
+
+    def _query_lines(
+        self,
+        command: str
+    ) -> list[str]:
+        dump: list[str] = self._dump_lines()
+        queries: dict[str, typing.Callable[[], list[str]]] = {
+            'ssp.brand': lambda: dump[0: 1],
+            'ssp.model': lambda: dump[1: 2],
+            'ssp.power': lambda: dump[2: 3],
+            'ssp.procstate': lambda: dump[3: 4],
+            'ssp.vol': lambda: dump[4: 5],
+            'ssp.mute': lambda: dump[5: 6],
+            'ssp.input.list': self._input_lines,
+            'ssp.zones.list': self._zone_lines,
+            'ssp.preset.list': self._preset_lines,
+            'ssp.preset': lambda: [f'ssp.preset.[{self.preset_id}]'],
+            'ssp.input': lambda: [f'ssp.input.[{self.input_id}]'],
+            'ssp.inputZone2': lambda: [f'ssp.inputZone2.[{self.input_zone2_id}]'],
+        }
+        query = queries.get(command)
+        return query() if query is not None else []
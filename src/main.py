@@ -9,6 +9,10 @@ from stormaudio_isp_telnet.telnet_client import (
 )
 
 from stormaudio_isp_telnet.constants import PowerCommand
+from stormaudio_isp_telnet.volume_curve import (
+    decibels_to_volume_level,
+    volume_level_to_decibels
+)
 
 
 # def db_to_percentage(db: Decimal) -> Decimal:
@@ -20,33 +24,6 @@ from stormaudio_isp_telnet.constants import PowerCommand
 #     decimalPercentage: Decimal = Decimal(percentage)
 #     return (decimalPercentage / Decimal(100)).log10() * Decimal(10)
 
-ZERO = Decimal(0)
-ONE = Decimal(1)
-
-volume_control_decibel_range: Decimal = Decimal(60)
-log_a: Decimal = Decimal(1) / \
-    (Decimal(10) ** (volume_control_decibel_range / Decimal(20)))
-log_b: Decimal = (Decimal(1) / Decimal(log_a)).ln()
-
-
-def volume_level_to_decibels(volume_level: Decimal) -> Decimal:
-    if volume_level <= ZERO:
-        return -volume_control_decibel_range
-    elif volume_level >= ONE:
-        return ZERO
-    x = log_a * (log_b * volume_level).exp()
-    return Decimal(20) * x.log10()
-
-
-def decibels_to_volume_level(decibels: Decimal) -> Decimal:
-    if decibels <= -volume_control_decibel_range:
-        return ZERO
-    elif decibels >= ZERO:
-        return ONE
-    x = 10 ** (decibels / Decimal(20))
-    return (x / log_a).ln() / log_b
-
-
 async def _async_on_device_state_updated():
     print('Device state updated')
 
@@ -0,0 +1,105 @@
+"""Fast conversions for the numeric fields emitted by the ISP.
+
+Volumes and delays are carried as fixed-point integers in tenths (of a dB
+or of a millisecond); Decimal values are only produced on request. The
+device emits a small set of distinct value strings, so string parsing is
+memoized."""
+
+from __future__ import annotations
+from decimal import Decimal, ROUND_HALF_EVEN
+from enum import Enum
+from functools import lru_cache
+
+import typing
+
+TENTHS_EXPONENT: int = -1
+
+_MEMO_SIZE: int = 4096
+
+E = typing.TypeVar('E', bound=Enum)
+
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def parse_tenths(
+    value: str
+) -> int:
+    """Parses a decimal string (e.g. '-40.5') into integer tenths (-405)."""
+    return decimal_to_tenths(Decimal(value))
+
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def parse_int(
+    value: str
+) -> int:
+    return int(value)
+
+
+def decimal_to_tenths(
+    value: Decimal | int | float
+) -> int:
+    """Converts a number to integer tenths, rounding half to even."""
+    return int(
+        (Decimal(value) * 10).to_integral_value(rounding=ROUND_HALF_EVEN)
+    )
+
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def tenths_to_decimal(
+    value: int
+) -> Decimal:
+    """Converts integer tenths back into a Decimal with one fractional
+        digit (-405 -> Decimal('-40.5'))."""
+    return Decimal(value).scaleb(TENTHS_EXPONENT)
+
+
+def optional_tenths_to_decimal(
+    value: int | None
+) -> Decimal | None:
+    return None if value is None else tenths_to_decimal(value)
+
+
+def optional_decimal_to_tenths(
+    value: Decimal | int | float | None
+) -> int | None:
+    return None if value is None else decimal_to_tenths(value)
+
+
+class EnumTable(typing.Generic[E]):
+    """Precomputed int -> member table for an int-valued Enum; avoids the
+        cost of Enum value lookup on every parsed field. Values that are not
+        members map to the default member, if one is given."""
+
+    def __init__(
+        self,
+        enum_type: type[E],
+        default: E = None
+    ):
+        self._enum_type: type[E] = enum_type
+        self._default: E = default
+        self._members: dict[int, E] = {
+            member.value: member for member in enum_type
+        }
+
+    def get_enum_type(
+        self
+    ) -> type[E]:
+        return self._enum_type
+
+    def from_int(
+        self,
+        value: int
+    ) -> E:
+        """Returns the member for the given value; if the value is not a
+            member, returns the default or, without a default, raises
+            ValueError like the Enum constructor."""
+        member: E = self._members.get(value, self._default)
+        if member is None:
+            raise ValueError(
+                f'{value!r} is not a valid {self._enum_type.__qualname__}')
+        return member
+
+    def from_str(
+        self,
+        value: str
+    ) -> E:
+        return self.from_int(parse_int(value))
@@ -14,6 +14,7 @@ class ProcessorState(Enum):
 
 
 class VideoInputID(Enum):
+    UNKNOWN = -1
     NONE = 0
     HDMI1 = 1
     HDMI2 = 2
@@ -26,6 +27,7 @@ class VideoInputID(Enum):
 
 
 class AudioInputID(Enum):
+    UNKNOWN = -1
     NONE = 0
     HDMI1 = 1
     HDMI2 = 2
@@ -56,6 +58,7 @@ class AudioInputID(Enum):
 
 
 class AudioZone2InputID(Enum):
+    UNKNOWN = -1
     NONE = 0
     HDMI1 = 1
     HDMI2 = 2
@@ -87,6 +90,7 @@ class AudioZone2InputID(Enum):
 
 
 class ZoneLayoutType(Enum):
+    UNKNOWN = -1
     DOWNMIX = 2000
     MONO = 2001
     STEREO_AND_STEREO_AV = 2002
@@ -94,5 +98,6 @@ class ZoneLayoutType(Enum):
 
 
 class ZoneType(Enum):
+    UNKNOWN = -1
     MAIN_SPEAKERS = 0
     ALTERNATE_SPEAKERS = 1
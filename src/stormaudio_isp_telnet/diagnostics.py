@@ -0,0 +1,79 @@
+"""Diagnostics for lines received from the ISP that could not be parsed"""
+
+from __future__ import annotations
+from collections import deque
+import time
+
+# Exceptions raised by malformed or unexpected device output (bad int or
+# enum values, short bracket fields, decimal.InvalidOperation); these are
+# isolated to the offending line or field instead of ending the connection.
+# Anything else is a bug in the client and is not caught.
+PARSE_ERRORS: tuple[type[Exception], ...] = (
+    ValueError,
+    IndexError,
+    ArithmeticError
+)
+
+
+class ParseErrorRecord:
+    """A line (or field of a line) that failed to parse."""
+
+    def __init__(
+        self,
+        timestamp: float,
+        line: str,
+        error: str
+    ):
+        self.timestamp: float = timestamp
+        self.line: str = line
+        self.error: str = error
+
+    def __repr__(
+        self
+    ) -> str:
+        return f'ParseErrorRecord({self.timestamp!r}, {self.line!r}, {self.error!r})'
+
+
+class ParseDiagnostics:
+    """Counts parse errors and keeps the most recent ones in a bounded ring;
+        timestamps are time.monotonic() values."""
+
+    def __init__(
+        self,
+        max_records: int = 64
+    ):
+        self._records: deque[ParseErrorRecord] = deque(maxlen=max_records)
+        self._error_count: int = 0
+
+    def record(
+        self,
+        line: str,
+        error: Exception | str
+    ) -> None:
+        if isinstance(error, Exception):
+            error = f'{type(error).__name__}: {error}'
+        self._error_count += 1
+        self._records.append(ParseErrorRecord(
+            timestamp=time.monotonic(),
+            line=line,
+            error=error
+        ))
+
+    def get_error_count(
+        self
+    ) -> int:
+        """Returns the total number of errors recorded, including those
+            that have since dropped out of the ring."""
+        return self._error_count
+
+    def get_records(
+        self
+    ) -> list[ParseErrorRecord]:
+        """Returns the most recent errors, oldest first."""
+        return list(self._records)
+
+    def clear(
+        self
+    ) -> None:
+        self._records.clear()
+        self._error_count = 0
@@ -0,0 +1,205 @@
+"""Discovery of Storm Audio ISP processors on the local network"""
+
+from __future__ import annotations
+import asyncio
+import ipaddress
+import time
+
+import typing
+
+from .line_reader import TokenizedLine
+from .telnet_client import DEFAULT_PORT, TelnetClient
+
+_FINGERPRINT_COMMANDS: bytes = b'ssp.brand\nssp.model\n'
+
+# Telnet negotiation sequences start with IAC; they are not part of lines
+_IAC: int = 255
+
+
+class DiscoveredDevice:
+    """A responder that identified itself as an ISP processor."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        brand: str,
+        model: str
+    ):
+        self.host: str = host
+        self.port: int = port
+        self.brand: str = brand
+        self.model: str = model
+
+    def __repr__(
+        self
+    ) -> str:
+        return f'DiscoveredDevice({self.host!r}, {self.port!r}, {self.brand!r}, {self.model!r})'
+
+    def create_client(
+        self,
+        async_on_device_state_updated,
+        async_on_disconnected,
+        **kwargs
+    ) -> TelnetClient:
+        """Returns a (not yet connected) client for this device."""
+        return TelnetClient(
+            self.host,
+            async_on_device_state_updated=async_on_device_state_updated,
+            async_on_disconnected=async_on_disconnected,
+            port=self.port,
+            **kwargs
+        )
+
+
+def _strip_telnet_negotiation(
+    data: bytes
+) -> bytes:
+    if _IAC not in data:
+        return data
+    out: bytearray = bytearray()
+    idx: int = 0
+    while idx < len(data):
+        if data[idx] == _IAC and idx + 1 < len(data):
+            command: int = data[idx + 1]
+            # WILL/WONT/DO/DONT carry an option byte; SB..SE a subnegotiation
+            if 251 <= command <= 254:
+                idx += 3
+            elif command == 250:
+                end: int = data.find(bytes([_IAC, 240]), idx)
+                idx = len(data) if end == -1 else end + 2
+            else:
+                idx += 2
+            continue
+        out.append(data[idx])
+        idx += 1
+    return bytes(out)
+
+
+def _parse_fingerprint_line(
+    line: str,
+    fingerprint: dict[str, str]
+) -> None:
+    tokens = TokenizedLine(line.strip()).get_field_tokens()
+    if len(tokens) == 3 and tokens[0] == 'ssp' \
+            and tokens[1] in ('brand', 'model') \
+            and type(tokens[2]) is list and len(tokens[2]) > 0:
+        fingerprint[tokens[1]] = tokens[2][0].strip('"')
+
+
+async def async_probe(
+    host: str,
+    port: int = DEFAULT_PORT,
+    connect_timeout: float = 0.5,
+    fingerprint_timeout: float = 1.0
+) -> DiscoveredDevice:
+    """Connects to the host and asks for its brand and model. Returns None
+    if nothing is listening or the responder does not answer as an ISP."""
+    try:
+        async with asyncio.timeout(connect_timeout):
+            reader, writer = await asyncio.open_connection(host, port)
+    except (TimeoutError, OSError):
+        return None
+
+    fingerprint: dict[str, str] = {}
+    try:
+        writer.write(_FINGERPRINT_COMMANDS)
+        async with asyncio.timeout(fingerprint_timeout):
+            remaining: str = ''
+            while 'brand' not in fingerprint or 'model' not in fingerprint:
+                data: bytes = await reader.read(4096)
+                if not data:
+                    break
+                output: str = remaining + _strip_telnet_negotiation(data) \
+                    .decode('utf-8', errors='replace')
+                lines: list[str] = output.split('\n')
+                remaining = lines.pop()
+                for line in lines:
+                    _parse_fingerprint_line(line, fingerprint)
+    except (TimeoutError, OSError):
+        pass
+    finally:
+        writer.close()
+
+    if 'brand' not in fingerprint:
+        return None
+    return DiscoveredDevice(
+        host=host,
+        port=port,
+        brand=fingerprint['brand'],
+        model=fingerprint.get('model')
+    )
+
+
+async def async_discover(
+    hosts: str | typing.Iterable[str],
+    ports: typing.Iterable[int] = (DEFAULT_PORT,),
+    concurrency: int = 256,
+    connect_timeout: float = 0.5,
+    fingerprint_timeout: float = 1.0
+) -> list[DiscoveredDevice]:
+    """Probes every host (a CIDR network such as '192.168.1.0/24', or an
+    iterable of host addresses) on every port concurrently, with at most
+    `concurrency` probes in flight. Returns the ISP processors found, in
+    probe order."""
+    if isinstance(hosts, str):
+        hosts = [str(x) for x in ipaddress.ip_network(hosts, strict=False).hosts()]
+    ports = tuple(ports)
+    semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+
+    async def probe(host: str, port: int) -> DiscoveredDevice:
+        async with semaphore:
+            return await async_probe(
+                host, port, connect_timeout, fingerprint_timeout)
+
+    results: list[DiscoveredDevice] = await asyncio.gather(
+        *(probe(host, port) for host in hosts for port in ports))
+    return [x for x in results if x is not None]
+
+
+class DiscoveryCache:
+    """Caches discovery results per set of hosts and ports for `ttl`
+    seconds; concurrent scans of the same hosts share one scan."""
+
+    def __init__(
+        self,
+        ttl: float = 300,
+        **discover_kwargs
+    ):
+        self._ttl: float = ttl
+        self._discover_kwargs = discover_kwargs
+        self._results: dict[tuple, tuple[float, list[DiscoveredDevice]]] = {}
+        self._scans: dict[tuple, asyncio.Task] = {}
+
+    def invalidate(
+        self
+    ) -> None:
+        self._results = {}
+
+    async def async_discover(
+        self,
+        hosts: str | typing.Iterable[str],
+        ports: typing.Iterable[int] = (DEFAULT_PORT,)
+    ) -> list[DiscoveredDevice]:
+        if not isinstance(hosts, str):
+            hosts = tuple(hosts)
+        ports = tuple(ports)
+        key: tuple = (hosts, ports)
+
+        cached = self._results.get(key)
+        if cached is not None and time.monotonic() - cached[0] <= self._ttl:
+            return list(cached[1])
+
+        scan: asyncio.Task = self._scans.get(key)
+        if scan is None:
+            scan = asyncio.create_task(
+                async_discover(hosts, ports, **self._discover_kwargs))
+            self._scans[key] = scan
+            try:
+                devices: list[DiscoveredDevice] = await asyncio.shield(scan)
+            finally:
+                del self._scans[key]
+            self._results[key] = (time.monotonic(), devices)
+        else:
+            devices = await asyncio.shield(scan)
+        return list(devices)
@@ -0,0 +1,242 @@
+"""Compact history of device state changes"""
+
+from __future__ import annotations
+from array import array
+import csv
+from enum import Enum
+import time
+
+import typing
+
+from .codec import tenths_to_decimal
+from .constants import *
+
+# Value stored for a field that changed to None (e.g. after being cleared)
+_NONE_VALUE: int = -(2 ** 63)
+
+
+def _encode_enum(
+    value: Enum
+) -> int:
+    return value.value
+
+
+def _encode_int(
+    value: int | bool
+) -> int:
+    return int(value)
+
+
+# Recorded fields: (DeviceState attribute holding the raw value, encoder,
+# decoder); the decoder turns a stored integer back into the public value.
+HISTORY_FIELDS: dict[str, tuple[str, typing.Callable, typing.Callable]] = {
+    'volume_db': ('volume_db_tenths', _encode_int, tenths_to_decimal),
+    'mute': ('mute', _encode_int, bool),
+    'input_id': ('input_id', _encode_int, int),
+    'input_zone2_id': ('input_zone2_id', _encode_int, int),
+    'preset_id': ('preset_id', _encode_int, int),
+    'power_command': ('power_command', _encode_enum, PowerCommand),
+    'processor_state': ('processor_state', _encode_enum, ProcessorState),
+}
+
+_FIELD_NAMES: tuple[str, ...] = tuple(HISTORY_FIELDS)
+
+
+class StateHistory:
+    """Records changes of selected DeviceState fields into a fixed-capacity
+        ring buffer backed by flat arrays (one timestamp, field index and
+        integer value per change), so memory use is bounded per device and
+        no DeviceState objects are retained. Timestamps are time.monotonic()
+        values; once the buffer is full the oldest changes are overwritten."""
+
+    def __init__(
+        self,
+        capacity: int = 65536,
+        fields: typing.Iterable[str] = _FIELD_NAMES
+    ):
+        if capacity <= 0:
+            raise ValueError('capacity must be positive')
+        fields = tuple(fields)
+        for field in fields:
+            if field not in HISTORY_FIELDS:
+                raise ValueError(f'Unsupported history field: {field}')
+        self._capacity: int = capacity
+        self._timestamps: array = array('d', bytes(8 * capacity))
+        self._field_idxs: array = array('B', bytes(capacity))
+        self._values: array = array('q', bytes(8 * capacity))
+        self._start: int = 0
+        self._count: int = 0
+        self._tracked: tuple[tuple[int, str, typing.Callable], ...] = tuple(
+            (_FIELD_NAMES.index(x), HISTORY_FIELDS[x][0], HISTORY_FIELDS[x][1])
+            for x in fields
+        )
+        self._tracked_by_field: dict[str, tuple[int, str, typing.Callable]] = {
+            x: tracked for x, tracked in zip(fields, self._tracked)
+        }
+        self._last_values: list[int] = [_NONE_VALUE] * len(_FIELD_NAMES)
+
+    def get_capacity(
+        self
+    ) -> int:
+        return self._capacity
+
+    def __len__(
+        self
+    ) -> int:
+        return self._count
+
+    def clear(
+        self
+    ) -> None:
+        self._start = 0
+        self._count = 0
+        self._last_values = [_NONE_VALUE] * len(_FIELD_NAMES)
+
+    def record_field(
+        self,
+        device_state,
+        field: str,
+        timestamp: float = None
+    ) -> None:
+        """Records the current value of one field if it is tracked and
+            differs from the last recorded value; suitable as a DeviceState
+            change listener."""
+        tracked = self._tracked_by_field.get(field)
+        if tracked is not None:
+            self._record(device_state, tracked, timestamp
+                         if timestamp is not None else time.monotonic())
+
+    def record_state(
+        self,
+        device_state,
+        timestamp: float = None
+    ) -> None:
+        """Records every tracked field whose value differs from the last
+            recorded value."""
+        if timestamp is None:
+            timestamp = time.monotonic()
+        for tracked in self._tracked:
+            self._record(device_state, tracked, timestamp)
+
+    def get_changes(
+        self,
+        field: str,
+        start: float = None,
+        end: float = None
+    ) -> list[tuple[float, typing.Any]]:
+        """Returns (timestamp, value) for each change of the field with
+            start <= timestamp <= end, oldest first."""
+        field_idx: int = _FIELD_NAMES.index(field)
+        decode_fn = HISTORY_FIELDS[field][2]
+        first: int = 0 if start is None else self._bisect_left(start)
+        changes: list[tuple[float, typing.Any]] = []
+        for logical_idx in range(first, self._count):
+            idx: int = (self._start + logical_idx) % self._capacity
+            timestamp: float = self._timestamps[idx]
+            if end is not None and timestamp > end:
+                break
+            if self._field_idxs[idx] == field_idx:
+                value: int = self._values[idx]
+                changes.append((
+                    timestamp,
+                    None if value == _NONE_VALUE else decode_fn(value)
+                ))
+        return changes
+
+    def get_recent_changes(
+        self,
+        field: str,
+        seconds: float
+    ) -> list[tuple[float, typing.Any]]:
+        """Returns the changes of the field within the last given seconds."""
+        return self.get_changes(field, start=time.monotonic() - seconds)
+
+    def to_columns(
+        self
+    ) -> dict[str, list]:
+        """Returns all recorded changes as columns, oldest first."""
+        timestamps: list[float] = []
+        fields: list[str] = []
+        values: list[int] = []
+        for idx in self._physical_idxs():
+            timestamps.append(self._timestamps[idx])
+            fields.append(_FIELD_NAMES[self._field_idxs[idx]])
+            value: int = self._values[idx]
+            values.append(None if value == _NONE_VALUE else value)
+        return {
+            'timestamp': timestamps,
+            'field': fields,
+            'value': values,
+        }
+
+    def export_csv(
+        self,
+        file: typing.TextIO | str
+    ) -> None:
+        """Writes all recorded changes as CSV rows of timestamp, field and
+            value (decoded, e.g. decibels for volume_db)."""
+        if isinstance(file, str):
+            with open(file, 'w', newline='') as f:
+                self.export_csv(f)
+            return
+        writer = csv.writer(file)
+        writer.writerow(['timestamp', 'field', 'value'])
+        for idx in self._physical_idxs():
+            field: str = _FIELD_NAMES[self._field_idxs[idx]]
+            value: int = self._values[idx]
+            if value == _NONE_VALUE:
+                decoded = ''
+            else:
+                decoded = HISTORY_FIELDS[field][2](value)
+                if isinstance(decoded, Enum):
+                    decoded = decoded.name
+            writer.writerow([repr(self._timestamps[idx]), field, decoded])
+
+    def _record(
+        self,
+        device_state,
+        tracked: tuple[int, str, typing.Callable],
+        timestamp: float
+    ) -> None:
+        field_idx, attribute_name, encode_fn = tracked
+        value = getattr(device_state, attribute_name)
+        value = _NONE_VALUE if value is None else encode_fn(value)
+        if value != self._last_values[field_idx]:
+            self._last_values[field_idx] = value
+            self._append(timestamp, field_idx, value)
+
+    def _append(
+        self,
+        timestamp: float,
+        field_idx: int,
+        value: int
+    ) -> None:
+        if self._count < self._capacity:
+            idx: int = (self._start + self._count) % self._capacity
+            self._count += 1
+        else:
+            idx = self._start
+            self._start = (self._start + 1) % self._capacity
+        self._timestamps[idx] = timestamp
+        self._field_idxs[idx] = field_idx
+        self._values[idx] = value
+
+    def _physical_idxs(
+        self
+    ) -> typing.Iterator[int]:
+        for logical_idx in range(self._count):
+            yield (self._start + logical_idx) % self._capacity
+
+    def _bisect_left(
+        self,
+        timestamp: float
+    ) -> int:
+        low: int = 0
+        high: int = self._count
+        while low < high:
+            mid: int = (low + high) // 2
+            if self._timestamps[(self._start + mid) % self._capacity] < timestamp:
+                low = mid + 1
+            else:
+                high = mid
+        return low
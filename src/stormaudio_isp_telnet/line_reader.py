@@ -1,4 +1,6 @@
 from __future__ import annotations
+from collections import deque
+import time
 
 
 class TokenizedLine:
@@ -92,20 +94,60 @@ class TokenizedLineReader:
 
 class TokenizedLinesReader:
     """Represents unconsumed lines of tokenized data;
-    allows observing and consuming the lines."""
+    allows observing and consuming the lines.
+
+    Lines are held in a ring buffer that is bounded in three ways: the total
+    number of buffered lines, the number of lines an open (incomplete) block
+    may span, and how long an open block may wait for its remaining lines.
+    When a bound is exceeded the open block is abandoned: its first line and
+    the block rows that follow it are dropped, and reading resumes at the
+    next top-level line.
+
+    A block evaluator that runs out of lines can save the rows it parsed so
+    far; the next evaluation of the same block resumes after the last line
+    read, so each block line is parsed once however the block is split
+    across reads."""
 
     def __init__(
-        self
+        self,
+        max_buffered_lines: int = 4096,
+        max_block_lines: int = 1024,
+        block_timeout: float = 10.0,
+        on_block_abandoned=None
     ):
-        self._lines: list[TokenizedLine] = []
+        self._lines: deque[TokenizedLine] = deque()
         self._next_line_idx: int = None
         self._saved_next_line_idx: int = None
+        self._max_buffered_lines: int = max_buffered_lines
+        self._max_block_lines: int = max_block_lines
+        self._block_timeout: float = block_timeout
+        self._on_block_abandoned = on_block_abandoned
+        self._head_since: float = None
+        self._abandoned_block_count: int = 0
+        self._dropped_line_count: int = 0
+        # (first line of the open block, rows parsed so far, next line index)
+        self._block_progress: tuple[TokenizedLine, list, int] = None
 
     def has_next_line(
         self
     ) -> bool:
         return self._next_line_idx is not None and self._next_line_idx < len(self._lines)
 
+    def get_buffered_line_count(
+        self
+    ) -> int:
+        return len(self._lines)
+
+    def get_abandoned_block_count(
+        self
+    ) -> int:
+        return self._abandoned_block_count
+
+    def get_dropped_line_count(
+        self
+    ) -> int:
+        return self._dropped_line_count
+
     def add_lines(
         self,
         lines: list[str]
@@ -115,6 +157,9 @@ class TokenizedLinesReader:
         if self._next_line_idx is None and len(self._lines) > 0:
             self._next_line_idx = 0
             self._saved_next_line_idx = 0
+            self._head_since = time.monotonic()
+        while len(self._lines) > self._max_buffered_lines:
+            self.abandon_block('buffered line limit exceeded')
 
     def read_next_line(
         self
@@ -131,11 +176,102 @@ class TokenizedLinesReader:
         if self._next_line_idx == len(self._lines):
             self._next_line_idx = None
             self._saved_next_line_idx = None
-            self._lines = []
+            self._lines.clear()
+            self._head_since = None
+            self._block_progress = None
         else:
-            self._saved_next_line_idx = self._next_line_idx
+            self._drop_lines(self._next_line_idx)
+            self._next_line_idx = 0
+            self._saved_next_line_idx = 0
+            self._head_since = time.monotonic()
 
     def reset_read_lines(
         self
     ) -> None:
         self._next_line_idx = self._saved_next_line_idx
+
+    def save_block_progress(
+        self,
+        rows: list
+    ) -> None:
+        """Called by a block evaluator that has read every buffered line of
+        the block opened by the first unconsumed line without finding its
+        end; saves the rows parsed so far and the current read position."""
+        self._block_progress = (self._lines[0], rows, self._next_line_idx)
+
+    def resume_block_progress(
+        self
+    ) -> list:
+        """Returns the rows saved for the block opened by the first
+        unconsumed line and moves the read position past the lines they were
+        parsed from; returns None (and leaves the position as is) if nothing
+        was saved for this block."""
+        if self._block_progress is None:
+            return None
+        start_line, rows, next_line_idx = self._block_progress
+        if len(self._lines) == 0 or self._lines[0] is not start_line:
+            self._block_progress = None
+            return None
+        self._next_line_idx = next_line_idx
+        return rows
+
+    def check_open_block(
+        self
+    ) -> bool:
+        """Called when the first unconsumed line opens a block that is not
+        yet complete; abandons the block if it spans too many lines or has
+        been open too long. Returns True if the block was abandoned."""
+        if len(self._lines) == 0:
+            return False
+        if len(self._lines) > self._max_block_lines:
+            self.abandon_block('block line limit exceeded')
+            return True
+        if self._head_since is not None and \
+                time.monotonic() - self._head_since > self._block_timeout:
+            self.abandon_block('block timed out')
+            return True
+        return False
+
+    def abandon_block(
+        self,
+        reason: str
+    ) -> None:
+        """Drops the first unconsumed line and any following rows of the
+        block it opens (lines sharing its leading tokens and followed by a
+        name token other than 'start'), then resumes at the next line."""
+        if len(self._lines) == 0:
+            return
+        start_line: TokenizedLine = self._lines[0]
+        start_tokens: list[str | list(str)] = start_line.get_field_tokens()
+        prefix: list[str | list(str)] = start_tokens[0: len(start_tokens) - 1]
+        drop_count: int = 1
+        while drop_count < len(self._lines):
+            tokens = self._lines[drop_count].get_field_tokens()
+            if len(tokens) <= len(prefix) \
+                    or tokens[0: len(prefix)] != prefix \
+                    or type(tokens[len(prefix)]) is not str \
+                    or tokens[len(prefix)] == 'start':
+                break
+            drop_count += 1
+
+        self._abandoned_block_count += 1
+        self._dropped_line_count += drop_count
+        self._drop_lines(drop_count)
+        if len(self._lines) == 0:
+            self._next_line_idx = None
+            self._saved_next_line_idx = None
+            self._head_since = None
+        else:
+            self._next_line_idx = 0
+            self._saved_next_line_idx = 0
+            self._head_since = time.monotonic()
+        if self._on_block_abandoned is not None:
+            self._on_block_abandoned(start_line.get_raw_line(), reason)
+
+    def _drop_lines(
+        self,
+        count: int
+    ) -> None:
+        for _ in range(count):
+            self._lines.popleft()
+        self._block_progress = None
@@ -0,0 +1,521 @@
+"""Incremental serialization of device state for downstream consumers.
+
+StatePatchEncoder produces one full snapshot followed by patches that carry
+only the fields changed since the previous message, tagged with the
+DeviceState sequence numbers they apply to and bring the receiver to. For the inputs, zones and presets lists only
+the rows that changed (keyed by id) are sent. StatePatchDecoder applies the
+messages to a mirror DeviceState.
+
+Messages are encoded either as JSON text or in a compact binary form."""
+
+from __future__ import annotations
+from enum import Enum
+import json
+
+import typing
+
+from .constants import *
+from .telnet_client import DEVICE_STATE_FIELDS, DeviceState, Input, Preset, Zone
+
+FORMAT_JSON: str = 'json'
+FORMAT_BINARY: str = 'binary'
+
+MESSAGE_FULL: str = 'full'
+MESSAGE_PATCH: str = 'patch'
+
+
+class PatchSequenceError(ValueError):
+    """A patch does not apply to the decoder's state: a message was lost or
+        reordered, or no full snapshot was received yet. The consumer needs a
+        new full snapshot (see StatePatchEncoder.reset())."""
+
+    def __init__(
+        self,
+        base_seq: int,
+        seq: int
+    ):
+        super().__init__(
+            f'Patch based on seq {base_seq} cannot be applied at seq {seq}')
+        self.base_seq: int = base_seq
+        self.seq: int = seq
+
+# Scalar field -> (attribute holding the raw value, enum type if any)
+_SCALAR_ENCODINGS: dict[str, tuple[str, type[Enum]]] = {
+    'brand': ('brand', None),
+    'model': ('model', None),
+    'power_command': ('power_command', PowerCommand),
+    'processor_state': ('processor_state', ProcessorState),
+    'volume_db': ('volume_db_tenths', None),
+    'mute': ('mute', None),
+    'input_id': ('input_id', None),
+    'input_zone2_id': ('input_zone2_id', None),
+    'preset_id': ('preset_id', None),
+}
+
+# Field codes used as keys in the binary encoding
+_FIELD_CODES: dict[str, int] = {
+    x: idx for idx, x in enumerate(DEVICE_STATE_FIELDS)}
+_FIELDS_BY_CODE: dict[int, str] = {v: k for k, v in _FIELD_CODES.items()}
+
+
+def _enum_value(
+    value: Enum
+) -> int:
+    return None if value is None else value.value
+
+
+def _to_enum(
+    enum_type: type[Enum],
+    value: int
+) -> Enum:
+    return None if value is None else enum_type(value)
+
+
+def _input_to_row(
+    input: Input
+) -> list:
+    return [
+        input.id,
+        input.name,
+        _enum_value(input.video_in_id),
+        _enum_value(input.audio_in_id),
+        _enum_value(input.audio_zone2_in_id),
+        input.delay_ms_tenths
+    ]
+
+
+def _input_from_row(
+    row: list
+) -> Input:
+    return Input(
+        name=row[1],
+        id=row[0],
+        video_in_id=_to_enum(VideoInputID, row[2]),
+        audio_in_id=_to_enum(AudioInputID, row[3]),
+        audio_zone2_in_id=_to_enum(AudioZone2InputID, row[4]),
+        delay_ms_tenths=row[5]
+    )
+
+
+def _zone_to_row(
+    zone: Zone
+) -> list:
+    return [
+        zone.id,
+        zone.name,
+        _enum_value(zone.zone_layout_type),
+        _enum_value(zone.zone_type),
+        zone.use_zone2_source,
+        zone.volume_db_tenths,
+        zone.delay_ms_tenths,
+        zone.mute
+    ]
+
+
+def _zone_from_row(
+    row: list
+) -> Zone:
+    return Zone(
+        id=row[0],
+        name=row[1],
+        zone_layout_type=_to_enum(ZoneLayoutType, row[2]),
+        zone_type=_to_enum(ZoneType, row[3]),
+        use_zone2_source=row[4],
+        volume_db=None,
+        delay_ms=None,
+        mute=row[7],
+        volume_db_tenths=row[5],
+        delay_ms_tenths=row[6]
+    )
+
+
+def _preset_to_row(
+    preset: Preset
+) -> list:
+    return [
+        preset.id,
+        preset.name,
+        None if preset.audio_zone_ids is None else list(preset.audio_zone_ids),
+        preset.sphereaudio_theater_enabled
+    ]
+
+
+def _preset_from_row(
+    row: list
+) -> Preset:
+    return Preset(
+        name=row[1],
+        id=row[0],
+        audio_zone_ids=row[2],
+        sphereaudio_theater_enabled=row[3]
+    )
+
+
+# List field -> (item to row, row to item); the first row element is the id
+_ROW_CODECS: dict[str, tuple[typing.Callable, typing.Callable]] = {
+    'inputs': (_input_to_row, _input_from_row),
+    'zones': (_zone_to_row, _zone_from_row),
+    'presets': (_preset_to_row, _preset_from_row),
+}
+
+
+class StatePatchEncoder:
+    """Encodes a DeviceState as a full snapshot on the first call to encode()
+        and as patches afterwards.
+
+        A message is a mapping with:
+          't': 'full' or 'patch'
+          's': DeviceState sequence number the message brings the receiver to
+          'b': (patches only) 's' of the previous message, which the patch
+               applies on top of
+          'f': changed scalar fields (volume_db in integer tenths, enums by
+               value) and list fields that became None
+          'l': per list field, 'u' (added or changed rows), 'r' (removed
+               ids) and, if the order of ids changed, 'o' (all ids in order)
+
+        One encoder serves one stream of messages; call reset() to start
+        over with a full snapshot (e.g. for a new subscriber, or when the
+        subscriber's decoder raises PatchSequenceError because a message was
+        lost or reordered)."""
+
+    def __init__(
+        self,
+        format: str = FORMAT_JSON
+    ):
+        if format not in (FORMAT_JSON, FORMAT_BINARY):
+            raise ValueError(f'Unknown format: {format}')
+        self._format: str = format
+        self._seq: int = None
+        # 's' of the last message returned; the base of the next patch
+        self._sent_seq: int = None
+        self._sent_rows: dict[str, dict[int, list]] = {}
+        self._sent_order: dict[str, list[int]] = {}
+
+    def reset(
+        self
+    ) -> None:
+        self._seq = None
+        self._sent_seq = None
+        self._sent_rows = {}
+        self._sent_order = {}
+
+    def encode(
+        self,
+        device_state: DeviceState
+    ) -> str | bytes:
+        """Returns the next message, or None if nothing changed since the
+            previous one."""
+        message: dict = self.build_message(device_state)
+        if message is None:
+            return None
+        if self._format == FORMAT_JSON:
+            return json.dumps(message, separators=(',', ':'))
+        return pack_message(message)
+
+    def build_message(
+        self,
+        device_state: DeviceState
+    ) -> dict:
+        """Returns the next message as a mapping, before encoding, or None
+            if nothing changed since the previous one."""
+        full: bool = self._seq is None
+        if full:
+            changed_fields: typing.Iterable[str] = DEVICE_STATE_FIELDS
+        else:
+            changed_fields = device_state.get_changed_since(self._seq)
+            if len(changed_fields) == 0:
+                return None
+
+        fields: dict = {}
+        lists: dict = {}
+        for field in changed_fields:
+            if field in _ROW_CODECS:
+                items: list = getattr(device_state, field)
+                if items is None:
+                    self._sent_rows.pop(field, None)
+                    self._sent_order.pop(field, None)
+                    if not full:
+                        fields[field] = None
+                    continue
+                diff: dict = self._diff_list(field, items)
+                if full or len(diff) > 0:
+                    lists[field] = diff
+            else:
+                attribute_name, enum_type = _SCALAR_ENCODINGS[field]
+                value = getattr(device_state, attribute_name)
+                fields[field] = _enum_value(value) \
+                    if enum_type is not None else value
+
+        self._seq = device_state.get_seq()
+        if full:
+            self._sent_seq = self._seq
+            return {
+                't': MESSAGE_FULL,
+                's': self._seq,
+                'f': fields,
+                'l': lists,
+            }
+        if len(fields) == 0 and len(lists) == 0:
+            # e.g. a list was touched but none of its rows changed
+            return None
+        base_seq: int = self._sent_seq
+        self._sent_seq = self._seq
+        return {
+            't': MESSAGE_PATCH,
+            's': self._seq,
+            'b': base_seq,
+            'f': fields,
+            'l': lists,
+        }
+
+    def _diff_list(
+        self,
+        field: str,
+        items: list
+    ) -> dict:
+        to_row_fn = _ROW_CODECS[field][0]
+        previous_rows: dict[int, list] = self._sent_rows.get(field, {})
+        rows: dict[int, list] = {}
+        order: list[int] = []
+        updated: list[list] = []
+        for item in items:
+            row: list = to_row_fn(item)
+            rows[row[0]] = row
+            order.append(row[0])
+            if previous_rows.get(row[0]) != row:
+                updated.append(row)
+        removed: list[int] = [x for x in previous_rows if x not in rows]
+        self._sent_rows[field] = rows
+
+        diff: dict = {}
+        if len(updated) > 0:
+            diff['u'] = updated
+        if len(removed) > 0:
+            diff['r'] = removed
+        if order != self._sent_order.get(field):
+            diff['o'] = order
+        self._sent_order[field] = order
+        return diff
+
+
+class StatePatchDecoder:
+    """Applies messages produced by StatePatchEncoder to a mirror
+        DeviceState.
+
+        Each patch must be based on the previously applied message; if one
+        was lost or reordered, apply_message() raises PatchSequenceError and
+        leaves the mirror unchanged. The consumer must then obtain a new
+        full snapshot (the producer calls StatePatchEncoder.reset() and
+        encodes again) before patches apply again."""
+
+    def __init__(
+        self,
+        format: str = FORMAT_JSON
+    ):
+        if format not in (FORMAT_JSON, FORMAT_BINARY):
+            raise ValueError(f'Unknown format: {format}')
+        self._format: str = format
+        self._device_state: DeviceState = DeviceState()
+        self._items: dict[str, dict[int, typing.Any]] = {}
+        self._seq: int = None
+
+    def get_device_state(
+        self
+    ) -> DeviceState:
+        return self._device_state
+
+    def get_seq(
+        self
+    ) -> int:
+        """Returns the sequence number of the last applied message."""
+        return self._seq
+
+    def decode(
+        self,
+        data: str | bytes
+    ) -> list[str]:
+        """Decodes and applies a message; returns the changed fields."""
+        if self._format == FORMAT_JSON:
+            message: dict = json.loads(data)
+        else:
+            message = unpack_message(data)
+        return self.apply_message(message)
+
+    def apply_message(
+        self,
+        message: dict
+    ) -> list[str]:
+        """Applies a decoded message; returns the changed fields. Raises
+            PatchSequenceError for a patch that is not based on the last
+            applied message (including one received before any full
+            snapshot)."""
+        if message['t'] == MESSAGE_FULL:
+            self._device_state = DeviceState()
+            self._items = {}
+        elif self._seq is None or message['b'] != self._seq:
+            raise PatchSequenceError(message['b'], self._seq)
+
+        state: DeviceState = self._device_state
+        changed: list[str] = []
+        for field, value in message['f'].items():
+            if field in _ROW_CODECS:
+                self._items.pop(field, None)
+                setattr(state, field, None)
+            else:
+                attribute_name, enum_type = _SCALAR_ENCODINGS[field]
+                setattr(
+                    state,
+                    attribute_name,
+                    _to_enum(enum_type, value)
+                    if enum_type is not None else value
+                )
+            changed.append(field)
+
+        for field, diff in message['l'].items():
+            from_row_fn = _ROW_CODECS[field][1]
+            items: dict[int, typing.Any] = self._items.setdefault(field, {})
+            for id in diff.get('r', []):
+                items.pop(id, None)
+            for row in diff.get('u', []):
+                items[row[0]] = from_row_fn(row)
+            order: list[int] = diff.get('o')
+            if order is None:
+                order = [x.id for x in getattr(state, field) or []
+                         if x.id in items]
+                order.extend(x for x in items if x not in order)
+            setattr(state, field, [items[x] for x in order])
+            changed.append(field)
+
+        self._seq = message['s']
+        return changed
+
+
+# Compact binary encoding: each value is a one-byte tag followed by its
+# payload; integers are zigzag varints and field name keys are field codes.
+_TAG_NONE: int = 0
+_TAG_FALSE: int = 1
+_TAG_TRUE: int = 2
+_TAG_INT: int = 3
+_TAG_STR: int = 4
+_TAG_LIST: int = 5
+_TAG_DICT: int = 6
+_TAG_FIELD_KEY: int = 7
+
+
+def pack_message(
+    message: dict
+) -> bytes:
+    """Encodes a message mapping in the compact binary form."""
+    out: bytearray = bytearray()
+    _pack_value(out, message)
+    return bytes(out)
+
+
+def unpack_message(
+    data: bytes
+) -> dict:
+    """Decodes a message mapping from the compact binary form."""
+    value, offset = _unpack_value(memoryview(data), 0)
+    if offset != len(data):
+        raise ValueError('Trailing data after message')
+    return value
+
+
+def _pack_varint(
+    out: bytearray,
+    value: int
+) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _pack_value(
+    out: bytearray,
+    value
+) -> None:
+    if value is None:
+        out.append(_TAG_NONE)
+    elif value is False:
+        out.append(_TAG_FALSE)
+    elif value is True:
+        out.append(_TAG_TRUE)
+    elif isinstance(value, int):
+        out.append(_TAG_INT)
+        _pack_varint(out, (value << 1) if value >= 0 else ((-value << 1) - 1))
+    elif isinstance(value, str):
+        encoded: bytes = value.encode('utf-8')
+        out.append(_TAG_STR)
+        _pack_varint(out, len(encoded))
+        out += encoded
+    elif isinstance(value, (list, tuple)):
+        out.append(_TAG_LIST)
+        _pack_varint(out, len(value))
+        for item in value:
+            _pack_value(out, item)
+    elif isinstance(value, dict):
+        out.append(_TAG_DICT)
+        _pack_varint(out, len(value))
+        for key, item in value.items():
+            code: int = _FIELD_CODES.get(key)
+            if code is not None:
+                out.append(_TAG_FIELD_KEY)
+                out.append(code)
+            else:
+                _pack_value(out, key)
+            _pack_value(out, item)
+    else:
+        raise TypeError(f'Cannot encode value of type {type(value).__name__}')
+
+
+def _unpack_varint(
+    data: memoryview,
+    offset: int
+) -> tuple[int, int]:
+    result: int = 0
+    shift: int = 0
+    while True:
+        byte: int = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, offset
+        shift += 7
+
+
+def _unpack_value(
+    data: memoryview,
+    offset: int
+) -> tuple[typing.Any, int]:
+    tag: int = data[offset]
+    offset += 1
+    if tag == _TAG_NONE:
+        return None, offset
+    if tag == _TAG_FALSE:
+        return False, offset
+    if tag == _TAG_TRUE:
+        return True, offset
+    if tag == _TAG_INT:
+        value, offset = _unpack_varint(data, offset)
+        return (value >> 1) if not value & 1 else -((value + 1) >> 1), offset
+    if tag == _TAG_STR:
+        length, offset = _unpack_varint(data, offset)
+        return str(data[offset: offset + length], 'utf-8'), offset + length
+    if tag == _TAG_FIELD_KEY:
+        return _FIELDS_BY_CODE[data[offset]], offset + 1
+    if tag == _TAG_LIST:
+        length, offset = _unpack_varint(data, offset)
+        items: list = []
+        for _ in range(length):
+            item, offset = _unpack_value(data, offset)
+            items.append(item)
+        return items, offset
+    if tag == _TAG_DICT:
+        length, offset = _unpack_varint(data, offset)
+        mapping: dict = {}
+        for _ in range(length):
+            key, offset = _unpack_value(data, offset)
+            mapping[key], offset = _unpack_value(data, offset)
+        return mapping, offset
+    raise ValueError(f'Unknown tag: {tag}')
@@ -0,0 +1,339 @@
+"""Synchronous facade over the asyncio telnet client, for threaded callers"""
+
+from __future__ import annotations
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+import copy
+from decimal import Decimal
+import threading
+
+import typing
+
+from .constants import *
+from .telnet_client import DEFAULT_PORT, DeviceState, TelnetClient
+
+
+class DeviceStateSnapshot(DeviceState):
+    """A read-only copy of a DeviceState, as published by SyncTelnetClient.
+        Setting a field or marking it updated raises AttributeError."""
+
+    @classmethod
+    def from_device_state(
+        cls,
+        device_state: DeviceState,
+        previous: DeviceStateSnapshot = None
+    ) -> DeviceStateSnapshot:
+        """Returns a shallow copy of the state. List fields unchanged since
+            the previous snapshot share its lists; zones are modified in
+            place, so a changed zone list is copied zone by zone."""
+        values: dict = copy.copy(device_state.__getstate__())
+        for name in ('_updated_at', '_field_seqs', '_field_connections'):
+            values[name] = dict(values[name])
+        for field in ('inputs', 'zones', 'presets'):
+            items: list = values[field]
+            if previous is not None \
+                    and previous.get_field_seq(field) == device_state.get_field_seq(field):
+                values[field] = previous.__dict__[field]
+            elif items is not None:
+                values[field] = [copy.copy(x) for x in items] \
+                    if field == 'zones' else list(items)
+        snapshot: DeviceStateSnapshot = cls.__new__(cls)
+        snapshot.__dict__.update(values)
+        return snapshot
+
+    def __setattr__(
+        self,
+        name: str,
+        value
+    ) -> None:
+        raise AttributeError('DeviceStateSnapshot is read-only')
+
+    def touch(
+        self,
+        field: str
+    ) -> None:
+        raise AttributeError('DeviceStateSnapshot is read-only')
+
+    def begin_connection(
+        self
+    ) -> None:
+        raise AttributeError('DeviceStateSnapshot is read-only')
+
+
+class SyncTelnetClient():
+    """Runs a TelnetClient on a dedicated background event loop thread and
+        exposes blocking, timeout-bounded methods to synchronous callers.
+
+        Device state is published as a read-only DeviceStateSnapshot that is
+        swapped in by reference after each update; get_device_state() never
+        takes a lock and never touches the event loop."""
+
+    def __init__(
+        self,
+        host: str,
+        on_device_state_updated: typing.Callable[[DeviceStateSnapshot], None] = None,
+        on_disconnected: typing.Callable[[], None] = None,
+        default_timeout: float = 10.0,
+        port: int = DEFAULT_PORT
+    ):
+        self._host: str = host
+        self._port: int = port
+        self._on_device_state_updated = on_device_state_updated
+        self._on_disconnected = on_disconnected
+        self._default_timeout: float = default_timeout
+        self._snapshot: DeviceStateSnapshot = \
+            DeviceStateSnapshot.from_device_state(DeviceState())
+        self._loop: asyncio.AbstractEventLoop = None
+        self._loop_thread: threading.Thread = None
+        self._callback_executor: ThreadPoolExecutor = None
+        self._client: TelnetClient = None
+        # The client whose state the current snapshot was copied from
+        self._snapshot_client: TelnetClient = None
+
+    def get_device_state(
+        self
+    ) -> DeviceStateSnapshot:
+        """Returns the latest published snapshot of the device state; it
+            is never mutated after publication."""
+        return self._snapshot
+
+    def is_running(
+        self
+    ) -> bool:
+        return self._loop_thread is not None and self._loop_thread.is_alive()
+
+    def connect(
+        self,
+        timeout: float = None
+    ) -> None:
+        """Starts the background event loop (if needed) and connects to the
+            telnet server. Raises ConnectionError on failure."""
+        self._start_loop_thread()
+        self._run(self._get_client().async_connect(), timeout)
+
+    def disconnect(
+        self,
+        timeout: float = None
+    ) -> None:
+        """Disconnects from the telnet server; the background loop keeps
+            running so that connect() can be called again."""
+        if self.is_running():
+            self._run(self._get_client().async_disconnect(), timeout)
+
+    def close(
+        self,
+        timeout: float = None
+    ) -> None:
+        """Disconnects and stops the background event loop thread."""
+        if not self.is_running():
+            return
+        try:
+            if self._client._writer is not None:
+                self.disconnect(timeout)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join(
+                timeout if timeout is not None else self._default_timeout)
+            self._callback_executor.shutdown(wait=False)
+            self._loop_thread = None
+            self._loop = None
+            self._callback_executor = None
+            # The client's asyncio primitives are bound to the stopped loop;
+            # the next connect() creates a new client on a new loop
+            self._client = None
+
+    def __enter__(
+        self
+    ) -> SyncTelnetClient:
+        self.connect()
+        return self
+
+    def __exit__(
+        self,
+        exc_type,
+        exc_value,
+        traceback
+    ) -> None:
+        self.close()
+
+    def get_field(
+        self,
+        field: str,
+        ttl: float = 0,
+        timeout: float = None
+    ):
+        """Blocking form of TelnetClient.async_get_field: returns the cached
+            value if younger than ttl seconds, otherwise queries the device."""
+        query_timeout: float = timeout if timeout is not None else self._default_timeout
+        return self._run(
+            self._get_client().async_get_field(field, ttl, query_timeout),
+            query_timeout + 1
+        )
+
+    def set_power_command(
+        self,
+        power_command: PowerCommand,
+        timeout: float = None
+    ) -> None:
+        self._run(self._get_client().async_set_power_command(power_command), timeout)
+
+    def request_zones(
+        self,
+        timeout: float = None
+    ) -> None:
+        self._run(self._get_client().async_request_zones(), timeout)
+
+    def set_zone_volume(
+        self,
+        zone_id: int,
+        volume_db: Decimal,
+        timeout: float = None
+    ) -> None:
+        self._run(self._get_client().async_set_zone_volume(zone_id, volume_db), timeout)
+
+    def set_zone_mute(
+        self,
+        zone_id: int,
+        mute: bool,
+        timeout: float = None
+    ) -> None:
+        self._run(self._get_client().async_set_zone_mute(zone_id, mute), timeout)
+
+    def set_zone_delay(
+        self,
+        zone_id: int,
+        delay_ms: Decimal,
+        timeout: float = None
+    ) -> None:
+        self._run(self._get_client().async_set_zone_delay(zone_id, delay_ms), timeout)
+
+    def set_mute(
+        self,
+        mute: bool,
+        timeout: float = None
+    ) -> None:
+        self._run(self._get_client().async_set_mute(mute), timeout)
+
+    def toggle_mute(
+        self,
+        timeout: float = None
+    ) -> None:
+        self._run(self._get_client().async_toggle_mute(), timeout)
+
+    def set_volume(
+        self,
+        volume_db: Decimal,
+        timeout: float = None
+    ) -> None:
+        self._run(self._get_client().async_set_volume(volume_db), timeout)
+
+    def set_input_id(
+        self,
+        input_id: int,
+        timeout: float = None
+    ) -> None:
+        self._run(self._get_client().async_set_input_id(input_id), timeout)
+
+    def set_input_zone2_id(
+        self,
+        input_zone2_id: int,
+        timeout: float = None
+    ) -> None:
+        self._run(self._get_client().async_set_input_zone2_id(input_zone2_id), timeout)
+
+    def set_preset_id(
+        self,
+        preset_id: int,
+        timeout: float = None
+    ) -> None:
+        self._run(self._get_client().async_set_preset_id(preset_id), timeout)
+
+    def _start_loop_thread(
+        self
+    ) -> None:
+        if self.is_running():
+            return
+        self._loop = asyncio.new_event_loop()
+        self._callback_executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix=f'stormaudio-isp-callbacks-{self._host}'
+        )
+        started: threading.Event = threading.Event()
+
+        def run_loop():
+            asyncio.set_event_loop(self._loop)
+            self._loop.call_soon(started.set)
+            try:
+                self._loop.run_forever()
+            finally:
+                self._loop.run_until_complete(
+                    self._loop.shutdown_asyncgens())
+                self._loop.close()
+
+        self._loop_thread = threading.Thread(
+            target=run_loop,
+            name=f'stormaudio-isp-loop-{self._host}',
+            daemon=True
+        )
+        self._loop_thread.start()
+        started.wait()
+
+        self._client = TelnetClient(
+            self._host,
+            async_on_device_state_updated=self._async_on_device_state_updated,
+            async_on_disconnected=self._async_on_disconnected,
+            port=self._port
+        )
+
+    def _get_client(
+        self
+    ) -> TelnetClient:
+        if self._client is None:
+            raise ConnectionError('Client is not running')
+        return self._client
+
+    def _run(
+        self,
+        coro: typing.Coroutine,
+        timeout: float = None
+    ):
+        """Schedules the coroutine on the background loop and blocks the
+            calling thread until it completes or the timeout elapses."""
+        if not self.is_running():
+            coro.close()
+            raise ConnectionError('Client is not running')
+        if threading.current_thread() is self._loop_thread:
+            coro.close()
+            raise RuntimeError(
+                'Blocking calls cannot be made from the client event loop thread')
+        future: Future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(
+                timeout if timeout is not None else self._default_timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    async def _async_on_device_state_updated(
+        self
+    ) -> None:
+        # Runs on the loop thread; copy once per update batch (not per line)
+        # and publish by a single reference assignment.
+        # Field seqs restart with each new client; only the previous
+        # snapshot of the same client can share lists
+        snapshot: DeviceStateSnapshot = DeviceStateSnapshot.from_device_state(
+            self._client.get_device_state(),
+            self._snapshot if self._snapshot_client is self._client else None)
+        self._snapshot_client = self._client
+        self._snapshot = snapshot
+        if self._on_device_state_updated is not None:
+            # Dispatch to the callback thread so slow sync handlers never
+            # stall the read loop.
+            self._callback_executor.submit(
+                self._on_device_state_updated, snapshot)
+
+    async def _async_on_disconnected(
+        self
+    ) -> None:
+        if self._on_disconnected is not None:
+            self._callback_executor.submit(self._on_disconnected)
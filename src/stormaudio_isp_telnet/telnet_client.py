@@ -1,27 +1,65 @@
 """Classes for communicating with the Storm Audio ISP series sound processors"""
 
 from __future__ import annotations
-from asyncio import create_task, Event, sleep, Task, timeout, TimeoutError
+import asyncio
+from asyncio import create_task, Event, Future, get_running_loop, sleep, Task, timeout, TimeoutError
 from decimal import *
 from enum import IntFlag, auto
 
+import time
 import typing
 
 import telnetlib3
 
+from .codec import *
 from .constants import *
+from .diagnostics import *
+from .history import StateHistory
 from .line_reader import *
 
+# Values unknown to this version (e.g. from newer firmware) map to UNKNOWN
+_VIDEO_INPUT_IDS: EnumTable[VideoInputID] = EnumTable(
+    VideoInputID, VideoInputID.UNKNOWN)
+_AUDIO_INPUT_IDS: EnumTable[AudioInputID] = EnumTable(
+    AudioInputID, AudioInputID.UNKNOWN)
+_AUDIO_ZONE2_INPUT_IDS: EnumTable[AudioZone2InputID] = EnumTable(
+    AudioZone2InputID, AudioZone2InputID.UNKNOWN)
+_ZONE_LAYOUT_TYPES: EnumTable[ZoneLayoutType] = EnumTable(
+    ZoneLayoutType, ZoneLayoutType.UNKNOWN)
+_ZONE_TYPES: EnumTable[ZoneType] = EnumTable(ZoneType, ZoneType.UNKNOWN)
+
 
 class DeviceState:
+    # Maps each stored attribute to the public field it backs
+    _FIELDS_BY_ATTRIBUTE: dict[str, str] = {
+        'brand': 'brand',
+        'model': 'model',
+        'power_command': 'power_command',
+        'processor_state': 'processor_state',
+        'volume_db_tenths': 'volume_db',
+        'mute': 'mute',
+        'inputs': 'inputs',
+        'input_id': 'input_id',
+        'input_zone2_id': 'input_zone2_id',
+        'zones': 'zones',
+        'presets': 'presets',
+        'preset_id': 'preset_id',
+    }
+
     def __init__(
         self
     ):
+        self._updated_at: dict[str, float] = {}
+        self._field_seqs: dict[str, int] = {}
+        self._field_connections: dict[str, int] = {}
+        self._seq: int = 0
+        self._connection_seq: int = 0
+        self._change_listener = None
         self.brand: str = None
         self.model: str = None
         self.power_command: PowerCommand = None
         self.processor_state: ProcessorState = None
-        self.volume_db: Decimal = None
+        self.volume_db_tenths: int = None
         self.mute: bool = None
         self.inputs: list(Input) = None
         self.input_id: int = None
@@ -29,6 +67,132 @@ class DeviceState:
         self.zones: list(Zone) = None
         self.presets: list(Preset) = None
         self.preset_id: int = None
+        self._updated_at.clear()
+        self._field_seqs.clear()
+        self._field_connections.clear()
+        self._seq = 0
+
+    def __setattr__(
+        self,
+        name: str,
+        value
+    ) -> None:
+        field: str = self._FIELDS_BY_ATTRIBUTE.get(name)
+        if field is None:
+            object.__setattr__(self, name, value)
+            return
+        changed: bool = self.__dict__.get(name) != value
+        object.__setattr__(self, name, value)
+        self._updated_at[field] = time.monotonic()
+        self._field_connections[field] = self._connection_seq
+        if changed:
+            self._seq += 1
+            self._field_seqs[field] = self._seq
+            if self._change_listener is not None:
+                self._change_listener(self, field)
+
+    def __getstate__(
+        self
+    ) -> dict:
+        # Copies and pickles of the state (such as published snapshots) do
+        # not carry the listener or whatever it is bound to
+        state: dict = dict(self.__dict__)
+        state['_change_listener'] = None
+        return state
+
+    def set_change_listener(
+        self,
+        change_listener
+    ) -> None:
+        """Sets a function called as change_listener(device_state, field)
+        immediately after each change of a field, or None to remove it."""
+        self._change_listener = change_listener
+
+    def touch(
+        self,
+        field: str
+    ) -> None:
+        """Marks the field as updated and changed; used when the contents
+        of a list field (e.g. a zone) are modified in place."""
+        self._updated_at[field] = time.monotonic()
+        self._field_connections[field] = self._connection_seq
+        self._seq += 1
+        self._field_seqs[field] = self._seq
+        if self._change_listener is not None:
+            self._change_listener(self, field)
+
+    def begin_connection(
+        self
+    ) -> None:
+        """Starts a new connection; fields not set since are reported as
+        stale."""
+        self._connection_seq += 1
+
+    def get_seq(
+        self
+    ) -> int:
+        """Returns the sequence number of the latest change; it increases
+        by one for each change of any field."""
+        return self._seq
+
+    def get_field_seq(
+        self,
+        field: str
+    ) -> int:
+        """Returns the sequence number at which the field last changed, or
+        0 if it has never been set."""
+        return self._field_seqs.get(field, 0)
+
+    def get_changed_since(
+        self,
+        seq: int
+    ) -> list[str]:
+        """Returns the fields that changed after the given sequence number,
+        in order of their last change."""
+        if seq >= self._seq:
+            return []
+        return sorted(
+            (x for x, x_seq in self._field_seqs.items() if x_seq > seq),
+            key=self._field_seqs.__getitem__
+        )
+
+    def is_stale(
+        self,
+        field: str
+    ) -> bool:
+        """Returns True if the field has not been set since the current
+        connection started (it was never set or survived a reconnect)."""
+        return self._field_connections.get(field) != self._connection_seq
+
+    def get_updated_at(
+        self,
+        field: str
+    ) -> float:
+        """Returns the time.monotonic() value at which the field was last
+        set, or None if it has never been set."""
+        return self._updated_at.get(field)
+
+    def get_age(
+        self,
+        field: str
+    ) -> float:
+        """Returns the seconds since the field was last set, or None if it
+        has never been set."""
+        updated_at: float = self._updated_at.get(field)
+        return None if updated_at is None else time.monotonic() - updated_at
+
+    @property
+    def volume_db(
+        self
+    ) -> Decimal:
+        return optional_tenths_to_decimal(self.volume_db_tenths)
+
+    @volume_db.setter
+    def volume_db(
+        self,
+        value: Decimal
+    ) -> None:
+        self.volume_db_tenths = optional_decimal_to_tenths(value)
 
 
 class Input:
@@ -39,14 +203,32 @@ class Input:
         video_in_id: VideoInputID,
         audio_in_id: AudioInputID,
         audio_zone2_in_id: AudioZone2InputID,
-        delay_ms: Decimal
+        delay_ms: Decimal = None,
+        delay_ms_tenths: int = None,
+        raw_fields: list[str] = None
     ):
         self.name: str = name
         self.id: int = id
         self.video_in_id: VideoInputID = video_in_id
         self.audio_in_id: AudioInputID = audio_in_id
         self.audio_zone2_in_id: AudioZone2InputID = audio_zone2_in_id
-        self.delay_ms: Decimal = delay_ms
+        self.delay_ms_tenths: int = delay_ms_tenths \
+            if delay_ms is None else decimal_to_tenths(delay_ms)
+        # Bracket fields as received from the device, when parsed from a line
+        self.raw_fields: list[str] = raw_fields
+
+    @property
+    def delay_ms(
+        self
+    ) -> Decimal:
+        return optional_tenths_to_decimal(self.delay_ms_tenths)
+
+    @delay_ms.setter
+    def delay_ms(
+        self,
+        value: Decimal
+    ) -> None:
+        self.delay_ms_tenths = optional_decimal_to_tenths(value)
 
 
 class Zone:
@@ -59,16 +241,49 @@ class Zone:
         use_zone2_source: bool,
         volume_db: Decimal,
         delay_ms: Decimal,
-        mute: bool
+        mute: bool,
+        volume_db_tenths: int = None,
+        delay_ms_tenths: int = None,
+        raw_fields: list[str] = None
     ):
         self.name: str = name
         self.id: int = id
         self.zone_layout_type: VideoInputID = zone_layout_type
         self.zone_type: AudioInputID = zone_type
         self.use_zone2_source: AudioZone2InputID = use_zone2_source
-        self.volume_db = volume_db
-        self.delay_ms: Decimal = delay_ms
+        self.volume_db_tenths: int = volume_db_tenths \
+            if volume_db is None else decimal_to_tenths(volume_db)
+        self.delay_ms_tenths: int = delay_ms_tenths \
+            if delay_ms is None else decimal_to_tenths(delay_ms)
         self.mute: bool = mute
+        # Bracket fields as received from the device, when parsed from a line
+        self.raw_fields: list[str] = raw_fields
+
+    @property
+    def volume_db(
+        self
+    ) -> Decimal:
+        return optional_tenths_to_decimal(self.volume_db_tenths)
+
+    @volume_db.setter
+    def volume_db(
+        self,
+        value: Decimal
+    ) -> None:
+        self.volume_db_tenths = optional_decimal_to_tenths(value)
+
+    @property
+    def delay_ms(
+        self
+    ) -> Decimal:
+        return optional_tenths_to_decimal(self.delay_ms_tenths)
+
+    @delay_ms.setter
+    def delay_ms(
+        self,
+        value: Decimal
+    ) -> None:
+        self.delay_ms_tenths = optional_decimal_to_tenths(value)
 
 
 class Preset:
@@ -85,6 +300,56 @@ class Preset:
         self.sphereaudio_theater_enabled: bool = sphereaudio_theater_enabled
 
 
+def _strip_quotes(
+    value: str
+) -> str:
+    return value.strip('"')
+
+
+def _parse_bool(
+    value: str
+) -> bool:
+    return bool(parse_int(value))
+
+
+def _parse_on_off(
+    value: str
+) -> bool:
+    if value == 'on':
+        return True
+    if value == 'off':
+        return False
+    return _parse_bool(value)
+
+
+# Command that makes the ISP report each DeviceState field
+DEVICE_STATE_QUERY_COMMANDS: dict[str, str] = {
+    'brand': 'ssp.brand',
+    'model': 'ssp.model',
+    'power_command': 'ssp.power',
+    'processor_state': 'ssp.procstate',
+    'volume_db': 'ssp.vol',
+    'mute': 'ssp.mute',
+    'inputs': 'ssp.input.list',
+    'input_id': 'ssp.input',
+    'input_zone2_id': 'ssp.inputZone2',
+    'zones': 'ssp.zones.list',
+    'presets': 'ssp.preset.list',
+    'preset_id': 'ssp.preset',
+}
+
+DEVICE_STATE_FIELDS: tuple[str, ...] = tuple(DEVICE_STATE_QUERY_COMMANDS)
+
+DEFAULT_PORT: int = 23
+
+# Partial output without a line terminator beyond this length is discarded
+MAX_LINE_LENGTH: int = 65536
+
+# A requested zones list not received within this many seconds is treated
+# as lost, so that a later zone set change requests it again
+ZONES_REFRESH_TIMEOUT: float = 5.0
+
+
 class ReadLinesResult(IntFlag):
     NONE = 0
     COMPLETE = auto()
@@ -102,12 +367,15 @@ class TelnetClient():
         host: str,
         async_on_device_state_updated,
         async_on_disconnected,
-        async_on_raw_line_received=None
+        async_on_raw_line_received=None,
+        state_history: StateHistory = None,
+        port: int = DEFAULT_PORT
     ):
         self._device_state: DeviceState = DeviceState()
         self._reader = None
         self._writer = None
         self._host: str = host
+        self._port: int = port
         self._remaining_output: str = None
         self._read_lines: TokenizedLinesReader = None
         self._async_on_device_state_updated = async_on_device_state_updated
@@ -116,26 +384,221 @@ class TelnetClient():
         self._keepalive_loop_task: Task = None
         self._keepalive_received: bool = False
         self._read_loop_finished: Event = Event()
+        self._parse_diagnostics: ParseDiagnostics = ParseDiagnostics()
+        self._ready_waiters: list[tuple[tuple[str, ...], Future]] = []
+        self._connect_started_at: float = None
+        self._time_to_ready: float = None
+        self._zones_refresh_requested_at: float = None
+        self._unknown_zone_notified: bool = False
+        self._state_history: StateHistory = state_history
+        if state_history is not None:
+            # Record each change as it is parsed; several changes of a field
+            # can arrive in one chunk
+            self._device_state.set_change_listener(state_history.record_field)
+        self._pending_queries: dict[str, tuple[float, Future]] = {}
 
     def get_device_state(
         self
     ) -> DeviceState:
         return self._device_state
 
+    def get_missing_fields(
+        self,
+        fields: typing.Iterable[str] = DEVICE_STATE_FIELDS
+    ) -> list[str]:
+        """Returns those of the given DeviceState fields that have not been
+        populated since the current connection started; values kept from a
+        previous connection count as missing."""
+        state: DeviceState = self._device_state
+        return [
+            field for field in fields
+            if getattr(state, field) is None or state.is_stale(field)
+        ]
+
+    def get_time_to_ready(
+        self
+    ) -> float:
+        """Returns the seconds from the start of the last connect until
+        every DeviceState field was populated, or None if not yet ready."""
+        return self._time_to_ready
+
+    async def async_wait_ready(
+        self,
+        fields: typing.Iterable[str] = DEVICE_STATE_FIELDS,
+        timeout: float = 10
+    ) -> float:
+        """Waits until the given DeviceState fields are populated on the
+        current connection, querying the device for only those that are
+        still missing. Returns the
+        seconds elapsed since the start of the last connect; raises
+        TimeoutError if the fields are not populated in time."""
+        fields = tuple(fields)
+        for field in fields:
+            if field not in DEVICE_STATE_QUERY_COMMANDS:
+                raise ValueError(f'Unknown device state field: {field}')
+
+        missing_fields: list[str] = self.get_missing_fields(fields)
+        if len(missing_fields) > 0:
+            if self._writer is None:
+                raise ConnectionError('Not connected')
+            waiter: Future = get_running_loop().create_future()
+            entry = (fields, waiter)
+            self._ready_waiters.append(entry)
+            try:
+                for command in dict.fromkeys(
+                        DEVICE_STATE_QUERY_COMMANDS[x] for x in missing_fields):
+                    await self._async_send_command(command)
+                async with asyncio.timeout(timeout):
+                    await waiter
+            finally:
+                if entry in self._ready_waiters:
+                    self._ready_waiters.remove(entry)
+        return time.monotonic() - self._connect_started_at
+
+    def _resolve_ready_waiters(
+        self
+    ) -> None:
+        if self._time_to_ready is None and self._connect_started_at is not None \
+                and len(self.get_missing_fields()) == 0:
+            self._time_to_ready = time.monotonic() - self._connect_started_at
+        for entry in list(self._ready_waiters):
+            fields, waiter = entry
+            if not waiter.done() and len(self.get_missing_fields(fields)) == 0:
+                waiter.set_result(None)
+                self._ready_waiters.remove(entry)
+
+    def _fail_ready_waiters(
+        self
+    ) -> None:
+        for _, waiter in self._ready_waiters:
+            if not waiter.done():
+                waiter.set_exception(ConnectionError('Disconnected'))
+        self._ready_waiters = []
+        for _, query in self._pending_queries.values():
+            if not query.done():
+                query.set_exception(ConnectionError('Disconnected'))
+        self._pending_queries = {}
+
+    async def async_get_field(
+        self,
+        field: str,
+        ttl: float = 0,
+        timeout: float = 5
+    ):
+        """Returns the value of the DeviceState field, if it was set within
+        the last ttl seconds; otherwise queries the device and waits for the
+        reply. Concurrent callers for the same field share one in-flight
+        query."""
+        if field not in DEVICE_STATE_QUERY_COMMANDS:
+            raise ValueError(f'Unknown device state field: {field}')
+        age: float = self._device_state.get_age(field)
+        if age is not None and age <= ttl:
+            return getattr(self._device_state, field)
+
+        pending = self._pending_queries.get(field)
+        if pending is None:
+            if self._writer is None:
+                raise ConnectionError('Not connected')
+            query: Future = get_running_loop().create_future()
+            # Consume the exception if every caller has timed out
+            query.add_done_callback(
+                lambda x: x.cancelled() or x.exception())
+            pending = (time.monotonic(), query)
+            self._pending_queries[field] = pending
+            try:
+                await self._async_send_command(
+                    DEVICE_STATE_QUERY_COMMANDS[field])
+            except BaseException:
+                del self._pending_queries[field]
+                raise
+        _, query = pending
+        try:
+            async with asyncio.timeout(timeout):
+                await asyncio.shield(query)
+        except TimeoutError:
+            # Let the next caller send a fresh query
+            if self._pending_queries.get(field) is pending:
+                del self._pending_queries[field]
+            raise
+        return getattr(self._device_state, field)
+
+    async def async_get_brand(self, ttl: float = 0, timeout: float = 5) -> str:
+        return await self.async_get_field('brand', ttl, timeout)
+
+    async def async_get_model(self, ttl: float = 0, timeout: float = 5) -> str:
+        return await self.async_get_field('model', ttl, timeout)
+
+    async def async_get_processor_state(self, ttl: float = 0, timeout: float = 5) -> ProcessorState:
+        return await self.async_get_field('processor_state', ttl, timeout)
+
+    async def async_get_volume(self, ttl: float = 0, timeout: float = 5) -> Decimal:
+        return await self.async_get_field('volume_db', ttl, timeout)
+
+    async def async_get_mute(self, ttl: float = 0, timeout: float = 5) -> bool:
+        return await self.async_get_field('mute', ttl, timeout)
+
+    async def async_get_input_id(self, ttl: float = 0, timeout: float = 5) -> int:
+        return await self.async_get_field('input_id', ttl, timeout)
+
+    async def async_get_input_zone2_id(self, ttl: float = 0, timeout: float = 5) -> int:
+        return await self.async_get_field('input_zone2_id', ttl, timeout)
+
+    async def async_get_preset_id(self, ttl: float = 0, timeout: float = 5) -> int:
+        return await self.async_get_field('preset_id', ttl, timeout)
+
+    async def async_get_inputs(self, ttl: float = 0, timeout: float = 5) -> list[Input]:
+        return await self.async_get_field('inputs', ttl, timeout)
+
+    async def async_get_zones(self, ttl: float = 0, timeout: float = 5) -> list[Zone]:
+        return await self.async_get_field('zones', ttl, timeout)
+
+    async def async_get_presets(self, ttl: float = 0, timeout: float = 5) -> list[Preset]:
+        return await self.async_get_field('presets', ttl, timeout)
+
+    def _resolve_pending_queries(
+        self
+    ) -> None:
+        for field, (sent_at, query) in list(self._pending_queries.items()):
+            updated_at: float = self._device_state.get_updated_at(field)
+            if updated_at is not None and updated_at >= sent_at:
+                del self._pending_queries[field]
+                if not query.done():
+                    query.set_result(None)
+
+    def get_state_history(
+        self
+    ) -> StateHistory:
+        """Returns the state change history given at construction, if any."""
+        return self._state_history
+
+    def get_parse_diagnostics(
+        self
+    ) -> ParseDiagnostics:
+        """Returns the count and most recent records of lines or fields
+        that could not be parsed and were skipped."""
+        return self._parse_diagnostics
+
     async def async_connect(
         self
     ) -> None:
         """Connects to the telnet server and reads data on the async
         event loop."""
-        self._read_lines = TokenizedLinesReader()
+        self._read_lines = TokenizedLinesReader(
+            on_block_abandoned=self._on_line_dropped)
         self._remaining_output = ''
 
         self._read_loop_finished.clear()
+        self._connect_started_at = time.monotonic()
+        self._time_to_ready = None
+        self._zones_refresh_requested_at = None
+        self._unknown_zone_notified = False
+        self._device_state.begin_connection()
 
         try:
             async with timeout(5):
                 self._reader, self._writer = await telnetlib3.open_connection(
                     self._host,
+                    self._port,
                     connect_minwait=0.0,
                     connect_maxwait=0.0,
                     shell=self._read_loop
@@ -206,96 +669,49 @@ class TelnetClient():
 
                 # Save the remaining partial output
                 self._remaining_output = output_lines[len(output_lines) - 1]
+                if len(self._remaining_output) > MAX_LINE_LENGTH:
+                    self._parse_diagnostics.record(
+                        self._remaining_output[0: 80], 'line length limit exceeded')
+                    self._remaining_output = ''
 
                 state_updated: bool = False
                 while self._read_lines.has_next_line():
-                    read_result: ReadLinesResult = ReadLinesResult.NONE
-
-                    read_result |= self._eval__line(
-                        ['ssp', 'keepalive'],
-                        self._eval_keepalive
-                    )
-
-                    read_result |= self._eval__single_bracket_field(
-                        ['ssp', 'brand'],
-                        lambda x: self._device_state.__setattr__('brand', x),
-                        lambda x: x.strip('"')
-                    )
-                    read_result |= self._eval__single_bracket_field(
-                        ['ssp', 'model'],
-                        lambda x: self._device_state.__setattr__('model', x),
-                        lambda x: x.strip('"')
-                    )
-                    read_result |= self._eval__line(
-                        ['ssp', 'power'],
-                        self._eval_power_command
-                    )
-                    read_result |= self._eval__line(
-                        ['ssp', 'procstate'],
-                        self._eval_processor_state
-                    )
-                    read_result |= self._eval__single_bracket_field(
-                        ['ssp', 'vol'],
-                        lambda x: self._device_state.__setattr__(
-                            'volume_db', x),
-                        lambda x: Decimal(x)
-                    )
-                    read_result |= self._eval__line(
-                        ['ssp', 'mute'],
-                        self._eval_mute
-                    )
-                    read_result |= self._eval__line(
-                        ['ssp', 'input', 'start'],
-                        self._eval_inputs
-                    )
-                    read_result |= self._eval__line(
-                        ['ssp', 'zones', 'start'],
-                        self._eval_zones
-                    )
-                    read_result |= self._eval__line(
-                        ['ssp', 'preset', 'start'],
-                        self._eval_presets
-                    )
-
-                    preset_read_result: ReadLinesResult = self._eval__single_bracket_field(
-                        ['ssp', 'preset'],
-                        lambda x: self._device_state.__setattr__(
-                            'preset_id', x),
-                        lambda x: int(x)
-                    )
-                    read_result |= preset_read_result
-                    # If the preset changes, request the zones list explicitly; the ISP
-                    # does not refresh the available zones when the preset changes
-                    if preset_read_result & ReadLinesResult.COMPLETE:
-                        await self.async_request_zones()
-
-                    read_result |= self._eval__single_bracket_field(
-                        ['ssp', 'input'],
-                        lambda x: self._device_state.__setattr__(
-                            'input_id', x),
-                        lambda x: int(x)
-                    )
-                    read_result |= self._eval__single_bracket_field(
-                        ['ssp', 'inputZone2'],
-                        lambda x: self._device_state.__setattr__(
-                            'input_zone2_id', x),
-                        lambda x: int(x)
-                    )
+                    seq: int = self._device_state.get_seq()
+                    try:
+                        read_result: ReadLinesResult = \
+                            await self._async_eval_next_lines()
+                    except PARSE_ERRORS as ex:
+                        # Quarantine the offending line rather than dropping
+                        # the connection; evaluators earlier in the chain may
+                        # already have updated state.
+                        self._quarantine_next_line(ex)
+                        if self._device_state.get_seq() != seq:
+                            state_updated = True
+                        continue
 
                     if read_result & ReadLinesResult.STATE_UPDATED:
                         # At least one line evaluator read data and updated state.
                         state_updated = True
 
                     if read_result & ReadLinesResult.INCOMPLETE:
-                        # At least one line evaluator didn't have enough lines.
+                        # At least one line evaluator didn't have enough lines;
+                        # wait for more unless the open block is abandoned.
+                        if self._read_lines.check_open_block():
+                            continue
                         break
 
                     if read_result == ReadLinesResult.IGNORED:
                         # All evaluators ignored the line; remove it.
-                        self._read_lines.read_next_line()
+                        ignored_line: TokenizedLineReader = \
+                            self._read_lines.read_next_line()
                         self._read_lines.consume_read_lines()
+                        if ignored_line.get_raw_line().startswith('ssp.zones.start'):
+                            # An interleaved line broke the zones list
+                            self._zones_refresh_requested_at = None
 
                 if state_updated:
+                    self._resolve_ready_waiters()
+                    self._resolve_pending_queries()
                     await self._async_notify_device_state_updated()
             except Exception as ex:
                 create_task(self.async_disconnect())
@@ -304,11 +720,123 @@ class TelnetClient():
 
         self._read_loop_finished.set()
         self._reader = None
+        self._fail_ready_waiters()
         await self._async_notify_disconnected()
 
         if exception is not None:
             raise RuntimeError("Error in reader loop") from exception
 
+    async def _async_eval_next_lines(
+        self
+    ) -> ReadLinesResult:
+        """Runs the next unconsumed line(s) through every line evaluator."""
+        read_result: ReadLinesResult = ReadLinesResult.NONE
+
+        read_result |= self._eval__line(
+            ['ssp', 'keepalive'],
+            self._eval_keepalive
+        )
+
+        read_result |= self._eval__single_bracket_field(
+            ['ssp', 'brand'],
+            lambda x: self._device_state.__setattr__('brand', x),
+            lambda x: x.strip('"')
+        )
+        read_result |= self._eval__single_bracket_field(
+            ['ssp', 'model'],
+            lambda x: self._device_state.__setattr__('model', x),
+            lambda x: x.strip('"')
+        )
+        read_result |= self._eval__line(
+            ['ssp', 'power'],
+            self._eval_power_command
+        )
+        read_result |= self._eval__line(
+            ['ssp', 'procstate'],
+            self._eval_processor_state
+        )
+        read_result |= self._eval__single_bracket_field(
+            ['ssp', 'vol'],
+            lambda x: self._device_state.__setattr__(
+                'volume_db_tenths', x),
+            parse_tenths
+        )
+        read_result |= self._eval__line(
+            ['ssp', 'mute'],
+            self._eval_mute
+        )
+        read_result |= self._eval__line(
+            ['ssp', 'input', 'start'],
+            self._eval_inputs
+        )
+        read_result |= self._eval__line(
+            ['ssp', 'zones', 'start'],
+            self._eval_zones
+        )
+        read_result |= self._eval__line(
+            ['ssp', 'preset', 'start'],
+            self._eval_presets
+        )
+
+        preset_read_result: ReadLinesResult = self._eval__single_bracket_field(
+            ['ssp', 'preset'],
+            lambda x: self._device_state.__setattr__(
+                'preset_id', x),
+            parse_int
+        )
+        read_result |= preset_read_result
+        # If the preset changes the set of zones, request the zones list
+        # explicitly; the ISP does not refresh the available zones when the
+        # preset changes
+        if preset_read_result & ReadLinesResult.COMPLETE \
+                and not self._preset_matches_zones():
+            await self._async_request_zones_refresh()
+
+        read_result |= self._eval__line(
+            ['ssp', 'zones', 'volume'],
+            lambda x: self._eval_zone_field(x, 'volume_db_tenths', parse_tenths)
+        )
+        read_result |= self._eval__line(
+            ['ssp', 'zones', 'mute'],
+            lambda x: self._eval_zone_field(x, 'mute', _parse_on_off)
+        )
+        read_result |= self._eval__line(
+            ['ssp', 'zones', 'delay'],
+            lambda x: self._eval_zone_field(x, 'delay_ms_tenths', parse_tenths)
+        )
+        # A change notification for a zone not in the list means the set of
+        # zones itself changed
+        if self._unknown_zone_notified:
+            self._unknown_zone_notified = False
+            await self._async_request_zones_refresh()
+
+        read_result |= self._eval__single_bracket_field(
+            ['ssp', 'input'],
+            lambda x: self._device_state.__setattr__(
+                'input_id', x),
+            parse_int
+        )
+        read_result |= self._eval__single_bracket_field(
+            ['ssp', 'inputZone2'],
+            lambda x: self._device_state.__setattr__(
+                'input_zone2_id', x),
+            parse_int
+        )
+
+        return read_result
+
+    def _quarantine_next_line(
+        self,
+        exception: Exception
+    ) -> None:
+        """Skips the first unconsumed line, which failed to parse, and
+        records it in the parse diagnostics."""
+        self._read_lines.reset_read_lines()
+        line: TokenizedLineReader = self._read_lines.read_next_line()
+        self._read_lines.consume_read_lines()
+        self._on_line_dropped(
+            line.get_raw_line() if line is not None else None, exception)
+
     async def _async_notify_disconnected(
         self
     ):
@@ -335,6 +863,61 @@ class TelnetClient():
     async def async_request_zones(self):
         await self._async_send_command('ssp.zones.list')
 
+    async def async_set_zone_volume(self, zone_id: int, volume_db: Decimal):
+        await self._async_send_command(f'ssp.zones.volume.[{zone_id}, {volume_db}]')
+
+    async def async_set_zone_mute(self, zone_id: int, mute: bool):
+        mute_value: str = '1' if mute else '0'
+        await self._async_send_command(f'ssp.zones.mute.[{zone_id}, {mute_value}]')
+
+    async def async_set_zone_delay(self, zone_id: int, delay_ms: Decimal):
+        await self._async_send_command(f'ssp.zones.delay.[{zone_id}, {delay_ms}]')
+
+    async def _async_request_zones_refresh(self):
+        # Coalesce refreshes until the zones list is received, its block is
+        # dropped, or the request times out
+        now: float = time.monotonic()
+        if self._zones_refresh_requested_at is None \
+                or now - self._zones_refresh_requested_at > ZONES_REFRESH_TIMEOUT:
+            self._zones_refresh_requested_at = now
+            await self.async_request_zones()
+
+    def _on_line_dropped(
+        self,
+        line: str,
+        error: Exception | str
+    ) -> None:
+        """Records a line (or block) dropped without being applied; if it was
+        the start of a zones list, a pending zones refresh is considered
+        lost."""
+        self._parse_diagnostics.record(line, error)
+        if line is not None and line.startswith('ssp.zones.start'):
+            self._zones_refresh_requested_at = None
+
+    def _preset_matches_zones(
+        self
+    ) -> bool:
+        """Returns True if the zones of the current preset are known to be
+        exactly the zones currently listed."""
+        state: DeviceState = self._device_state
+        if state.presets is None or state.zones is None:
+            return False
+        for preset in state.presets:
+            if preset.id == state.preset_id:
+                return preset.audio_zone_ids is not None and \
+                    set(preset.audio_zone_ids) == set(x.id for x in state.zones)
+        return False
+
+    def _find_zone(
+        self,
+        zone_id: int
+    ) -> Zone:
+        if self._device_state.zones is not None:
+            for zone in self._device_state.zones:
+                if zone.id == zone_id:
+                    return zone
+        return None
+
     async def async_set_mute(self, mute: bool):
         mute_command: str = 'on' if mute else 'off'
         await self._async_send_command(f'ssp.mute.{mute_command}')
@@ -397,6 +980,27 @@ class TelnetClient():
             continue_fn=parse_bracket_field
         )
 
+    def _eval_zone_field(
+        self,
+        line: TokenizedLineReader,
+        attribute_name: str,
+        convert_fn
+    ) -> ReadLinesResult:
+        """Applies a per-zone change notification ([zone id, value]) in place
+        to the matching zone. If the zone is not in the current list, flags
+        it so that the zones list is refreshed."""
+        bracket_fields: list(str) = line.pop_next_token()
+        if type(bracket_fields) is list and len(bracket_fields) >= 2:
+            value = convert_fn(bracket_fields[1])
+            zone: Zone = self._find_zone(parse_int(bracket_fields[0]))
+            if zone is None:
+                self._unknown_zone_notified = True
+                return ReadLinesResult.COMPLETE
+            setattr(zone, attribute_name, value)
+            self._device_state.touch('zones')
+            return ReadLinesResult.COMPLETE | ReadLinesResult.STATE_UPDATED
+        return ReadLinesResult.IGNORED
+
     def _eval_mute(
         self,
         line: TokenizedLineReader
@@ -444,22 +1048,31 @@ class TelnetClient():
         self,
         line: TokenizedLineReader
     ) -> ReadLinesResult:
-        new_inputs: list(Input) = []
+        # Rows parsed from earlier reads of this block are not parsed again
+        new_inputs: list(Input) = self._read_lines.resume_block_progress() or []
         while self._read_lines.has_next_line():
             line = self._read_lines.read_next_line()
             if line.pop_next_tokens_if_equal(['ssp', 'input', 'list']):
                 bracket_fields: list(str) = line.pop_next_token()
                 if type(bracket_fields) is list:
+                    id: int = self._parse_field(
+                        line, bracket_fields, 1, parse_int)
+                    if id is None:
+                        continue
                     input = Input(
-                        name=bracket_fields[0].strip('"'),
-                        id=int(bracket_fields[1]),
-                        video_in_id=VideoInputID(
-                            int(bracket_fields[2])),
-                        audio_in_id=AudioInputID(
-                            int(bracket_fields[3])),
-                        audio_zone2_in_id=AudioZone2InputID(
-                            int(bracket_fields[4])),
-                        delay_ms=Decimal(bracket_fields[6])
+                        name=self._parse_field(
+                            line, bracket_fields, 0, _strip_quotes),
+                        id=id,
+                        video_in_id=self._parse_field(
+                            line, bracket_fields, 2, _VIDEO_INPUT_IDS.from_str),
+                        audio_in_id=self._parse_field(
+                            line, bracket_fields, 3, _AUDIO_INPUT_IDS.from_str),
+                        audio_zone2_in_id=self._parse_field(
+                            line, bracket_fields, 4,
+                            _AUDIO_ZONE2_INPUT_IDS.from_str),
+                        delay_ms_tenths=self._parse_field(
+                            line, bracket_fields, 6, parse_tenths),
+                        raw_fields=bracket_fields
                     )
                     new_inputs.append(input)
                 else:
@@ -470,65 +1083,101 @@ class TelnetClient():
                 return ReadLinesResult.COMPLETE | ReadLinesResult.STATE_UPDATED
             else:
                 return ReadLinesResult.IGNORED
+        self._read_lines.save_block_progress(new_inputs)
         return ReadLinesResult.INCOMPLETE
 
     def _eval_zones(
         self,
         line: TokenizedLineReader
     ) -> ReadLinesResult:
-        new_zones: list(Zone) = []
+        new_zones: list(Zone) = self._read_lines.resume_block_progress() or []
         while self._read_lines.has_next_line():
             line = self._read_lines.read_next_line()
             if line.pop_next_tokens_if_equal(['ssp', 'zones', 'list']):
                 bracket_fields: list(str) = line.pop_next_token()
                 if type(bracket_fields) is list:
+                    id: int = self._parse_field(
+                        line, bracket_fields, 0, parse_int)
+                    if id is None:
+                        continue
                     zone = Zone(
-                        id=int(bracket_fields[0]),
-                        name=bracket_fields[1].strip('"'),
-                        zone_layout_type=ZoneLayoutType(
-                            int(bracket_fields[2])),
-                        zone_type=ZoneType(
-                            int(bracket_fields[3])),
-                        use_zone2_source=bool(int(bracket_fields[4])),
-                        volume_db=Decimal(bracket_fields[5]),
-                        delay_ms=Decimal(bracket_fields[6]),
-                        mute=bool(int(bracket_fields[10]))
+                        id=id,
+                        name=self._parse_field(
+                            line, bracket_fields, 1, _strip_quotes),
+                        zone_layout_type=self._parse_field(
+                            line, bracket_fields, 2, _ZONE_LAYOUT_TYPES.from_str),
+                        zone_type=self._parse_field(
+                            line, bracket_fields, 3, _ZONE_TYPES.from_str),
+                        use_zone2_source=self._parse_field(
+                            line, bracket_fields, 4, _parse_bool),
+                        volume_db=None,
+                        delay_ms=None,
+                        mute=self._parse_field(
+                            line, bracket_fields, 10, _parse_bool),
+                        volume_db_tenths=self._parse_field(
+                            line, bracket_fields, 5, parse_tenths),
+                        delay_ms_tenths=self._parse_field(
+                            line, bracket_fields, 6, parse_tenths),
+                        raw_fields=bracket_fields
                     )
                     new_zones.append(zone)
                 else:
                     return ReadLinesResult.IGNORED
             elif line.pop_next_tokens_if_equal(['ssp', 'zones', 'end']):
-                # set input list
+                # set zone list
                 self._device_state.zones = new_zones
+                self._zones_refresh_requested_at = None
                 return ReadLinesResult.COMPLETE | ReadLinesResult.STATE_UPDATED
             else:
                 return ReadLinesResult.IGNORED
+        self._read_lines.save_block_progress(new_zones)
         return ReadLinesResult.INCOMPLETE
 
+    def _parse_field(
+        self,
+        line: TokenizedLineReader,
+        bracket_fields: list[str],
+        idx: int,
+        convert_fn
+    ):
+        """Converts one bracket field of a list row; a missing or malformed
+        field is recorded in the parse diagnostics and yields None so that
+        the rest of the row (and block) is kept."""
+        try:
+            return convert_fn(bracket_fields[idx])
+        except PARSE_ERRORS as ex:
+            self._parse_diagnostics.record(line.get_raw_line(), ex)
+            return None
+
     def _parse_audio_zone_ids(self, bracket_field: str):
         bracket_field_token = bracket_field.strip('"["').strip('"]"')
         bracket_field_tokens: list[str] = []
         if len(bracket_field_token) > 0:
             bracket_field_tokens = bracket_field_token.split('","')
-        return list(map(lambda x: int(x), bracket_field_tokens))
+        return list(map(parse_int, bracket_field_tokens))
 
     def _eval_presets(
         self,
         line: TokenizedLineReader
     ) -> ReadLinesResult:
-        new_presets: list(Preset) = []
+        new_presets: list(Preset) = self._read_lines.resume_block_progress() or []
         while self._read_lines.has_next_line():
             line = self._read_lines.read_next_line()
             if line.pop_next_tokens_if_equal(['ssp', 'preset', 'list']):
                 bracket_fields: list(str) = line.pop_next_token()
                 if type(bracket_fields) is list:
+                    id: int = self._parse_field(
+                        line, bracket_fields, 1, parse_int)
+                    if id is None:
+                        continue
                     preset = Preset(
-                        name=bracket_fields[0].strip('"'),
-                        id=int(bracket_fields[1]),
-                        audio_zone_ids=self._parse_audio_zone_ids(
-                            bracket_fields[2]),
-                        sphereaudio_theater_enabled=bool(
-                            int(bracket_fields[3]))
+                        name=self._parse_field(
+                            line, bracket_fields, 0, _strip_quotes),
+                        id=id,
+                        audio_zone_ids=self._parse_field(
+                            line, bracket_fields, 2, self._parse_audio_zone_ids),
+                        sphereaudio_theater_enabled=self._parse_field(
+                            line, bracket_fields, 3, _parse_bool)
                     )
                     new_presets.append(preset)
                 else:
@@ -539,4 +1188,5 @@ class TelnetClient():
                 return ReadLinesResult.COMPLETE | ReadLinesResult.STATE_UPDATED
             else:
                 return ReadLinesResult.IGNORED
+        self._read_lines.save_block_progress(new_presets)
         return ReadLinesResult.INCOMPLETE
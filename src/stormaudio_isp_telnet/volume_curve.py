@@ -0,0 +1,174 @@
+"""Mapping between normalized volume levels (0..1) and decibels"""
+
+from __future__ import annotations
+from decimal import Decimal
+
+import typing
+
+
+class VolumeCurve():
+    """Maps normalized volume levels in the range [0, 1] to decibels in the
+        range [min_db, max_db] and back.
+
+        The mapping is db = min_db + (max_db - min_db) * level ** shape; a
+        shape of 1 is linear in decibels (the curve historically used by the
+        integrations), larger values give finer control at low levels.
+
+        All decibel values and their corresponding levels are precomputed at
+        the given step resolution (the ISP accepts 0.5 dB steps), so each
+        conversion is a single index computation and table lookup. Converting
+        a table decibel value to a level and back returns the same value."""
+
+    def __init__(
+        self,
+        min_db: Decimal = Decimal(-60),
+        max_db: Decimal = Decimal(0),
+        step_db: Decimal = Decimal('0.5'),
+        shape: float = 1.0
+    ):
+        min_db = Decimal(min_db)
+        max_db = Decimal(max_db)
+        step_db = Decimal(step_db)
+        if max_db <= min_db:
+            raise ValueError('max_db must be greater than min_db')
+        if step_db <= 0:
+            raise ValueError('step_db must be positive')
+        if shape <= 0:
+            raise ValueError('shape must be positive')
+        step_count: Decimal = (max_db - min_db) / step_db
+        if step_count != step_count.to_integral_value():
+            raise ValueError('step_db must evenly divide the decibel range')
+
+        self._min_db: Decimal = min_db
+        self._max_db: Decimal = max_db
+        self._step_db: Decimal = step_db
+        self._shape: float = float(shape)
+        self._step_count: int = int(step_count)
+
+        self._min_db_float: float = float(min_db)
+        self._max_db_float: float = float(max_db)
+        self._step_db_float: float = float(step_db)
+
+        inverse_shape: float = 1.0 / self._shape
+        self._decibels: tuple[Decimal, ...] = tuple(
+            min_db + step_db * idx for idx in range(self._step_count + 1)
+        )
+        self._levels: tuple[Decimal, ...] = tuple(
+            Decimal(repr((idx / self._step_count) ** inverse_shape))
+            for idx in range(self._step_count + 1)
+        )
+
+    @property
+    def min_db(
+        self
+    ) -> Decimal:
+        return self._min_db
+
+    @property
+    def max_db(
+        self
+    ) -> Decimal:
+        return self._max_db
+
+    @property
+    def step_db(
+        self
+    ) -> Decimal:
+        return self._step_db
+
+    @property
+    def shape(
+        self
+    ) -> float:
+        return self._shape
+
+    def get_table(
+        self
+    ) -> list[tuple[Decimal, Decimal]]:
+        """Returns all (level, decibels) points of the curve, from lowest to
+            highest; useful for drawing graphs."""
+        return list(zip(self._levels, self._decibels))
+
+    def level_to_decibels(
+        self,
+        volume_level: Decimal | float
+    ) -> Decimal:
+        """Converts a volume level to decibels, rounded to the nearest step."""
+        return self._decibels[self._level_to_idx(volume_level)]
+
+    def decibels_to_level(
+        self,
+        decibels: Decimal | float
+    ) -> Decimal:
+        """Converts decibels (rounded to the nearest step) to a volume level."""
+        return self._levels[self._decibels_to_idx(decibels)]
+
+    def levels_to_decibels(
+        self,
+        volume_levels: typing.Iterable[Decimal | float]
+    ) -> list[Decimal]:
+        """Batch form of level_to_decibels."""
+        table = self._decibels
+        to_idx = self._level_to_idx
+        return [table[to_idx(x)] for x in volume_levels]
+
+    def decibels_to_levels(
+        self,
+        decibels: typing.Iterable[Decimal | float]
+    ) -> list[Decimal]:
+        """Batch form of decibels_to_level."""
+        table = self._levels
+        to_idx = self._decibels_to_idx
+        return [table[to_idx(x)] for x in decibels]
+
+    def decibels_ramp(
+        self,
+        start_db: Decimal | float,
+        end_db: Decimal | float
+    ) -> list[Decimal]:
+        """Returns every step between start_db and end_db (both inclusive,
+            rounded to the nearest step), in the direction of travel."""
+        start_idx: int = self._decibels_to_idx(start_db)
+        end_idx: int = self._decibels_to_idx(end_db)
+        if start_idx <= end_idx:
+            return list(self._decibels[start_idx: end_idx + 1])
+        return list(self._decibels[end_idx: start_idx + 1][::-1])
+
+    def _level_to_idx(
+        self,
+        volume_level: Decimal | float
+    ) -> int:
+        level: float = float(volume_level)
+        if level <= 0.0:
+            return 0
+        if level >= 1.0:
+            return self._step_count
+        if self._shape != 1.0:
+            level = level ** self._shape
+        return int(level * self._step_count + 0.5)
+
+    def _decibels_to_idx(
+        self,
+        decibels: Decimal | float
+    ) -> int:
+        db: float = float(decibels)
+        if db <= self._min_db_float:
+            return 0
+        if db >= self._max_db_float:
+            return self._step_count
+        return int((db - self._min_db_float) / self._step_db_float + 0.5)
+
+
+DEFAULT_VOLUME_CURVE: VolumeCurve = VolumeCurve()
+
+
+def volume_level_to_decibels(
+    volume_level: Decimal | float
+) -> Decimal:
+    return DEFAULT_VOLUME_CURVE.level_to_decibels(volume_level)
+
+
+def decibels_to_volume_level(
+    decibels: Decimal | float
+) -> Decimal:
+    return DEFAULT_VOLUME_CURVE.decibels_to_level(decibels)